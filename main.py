@@ -1,14 +1,4 @@
-from pathlib import Path
-
 from openaq_anomaly_prediction.config import Configuration as config
-from openaq_anomaly_prediction.load.openaq import test
-from openaq_anomaly_prediction.utils.logger import ProgressLogger, logger
+from openaq_anomaly_prediction.utils.logger import logger
 
-print("PRINT")
-logger.trace("TRACE")
-logger.info("INFO")
-logger.warning("WARNING")
-logger.error("ERROR")
-logger.critical("CRITICAL")
 logger.success(f"MAIN: {config.ROOT_PATH}")
-test()
@@ -1,44 +1,31 @@
+import asyncio
 import os
-import sys
 import time
-from datetime import datetime as dt
-from pprint import pprint
+from datetime import date
 
-import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
-import pyarrow as pa
-import pyarrow.parquet as pq
-import seaborn as sns
 
 from openaq_anomaly_prediction.config import Configuration as cfg
-from openaq_anomaly_prediction.load.gcp import bq
-from openaq_anomaly_prediction.load.openaq import client as openaq
+from openaq_anomaly_prediction.load.gcp import gcs
 from openaq_anomaly_prediction.load.openmeteo import OpenMeteoClient
 from openaq_anomaly_prediction.load.openmeteo import client as openmeteo
 from openaq_anomaly_prediction.load.schemas.openmeteo_historical import (
     OpenMeteoHistoricalTable,
 )
 from openaq_anomaly_prediction.utils.helpers import (
-    concat_pq_to_pq,
     exec_time,
     get_parquet_filepaths,
-    get_trimestrial_periods,
-    parquets_to_csv,
+    get_trimester_specs,
+    write_pq_dataset,
 )
 from openaq_anomaly_prediction.utils.logger import (
     ProgressLogger,
-    grey,
-    hex,
+    hidden_cursor,
     logger,
-    rst,
 )
 
 # ---------------------------------------------------------------------
 
-# TODO: We're not handling the different structures of the PQ files we're concatenating
-# Some might have different columns depending on the parameters downloaded from Open-Meteo
-
 # TODO: Make 2 separate loops: one for downloading raw data, one for processing/concatenating ALL files at once
 
 # ---------------------------------------------------------------------
@@ -662,6 +649,21 @@ PERFECT_LOCATIONS = [
     },
 ]
 
+# Struct of arrays of the locations (1 contiguous array per field)
+LOCATIONS_IDS = np.fromiter(
+    (int(location["id"]) for location in PERFECT_LOCATIONS),
+    dtype=np.int64,
+    count=len(PERFECT_LOCATIONS),
+)
+LOCATIONS_LATITUDES = np.array(
+    [location["coordinates_latitude"] for location in PERFECT_LOCATIONS],
+    dtype=np.float64,
+)
+LOCATIONS_LONGITUDES = np.array(
+    [location["coordinates_longitude"] for location in PERFECT_LOCATIONS],
+    dtype=np.float64,
+)
+
 # Seoul (large)
 CITY_ID = "seoul"
 CITY_NAME = "Seoul"
@@ -699,14 +701,8 @@ CITY_LOCATIONS_IDS = ['2622594', '2622916', '2622586', '2623582', '2622714', '26
 # --------------------------------------------------------------------------------------
 # DOWNLOAD FROM OPENMETEO API: Download weather data for pre-filtered locations in the date range
 
-# ANSI Escape Codes for cursor control
-HIDE_CURSOR = "\033[?25l"
-SHOW_CURSOR = "\033[?25h"
-
-sys.stdout.write(HIDE_CURSOR)
-sys.stdout.flush()
-
-progress = ProgressLogger()
+progress = ProgressLogger(min_interval=0.5)
+PARAMETERS_HASH = OpenMeteoClient.get_parameters_hash()
 
 
 # ---------------------------------------------------------------------
@@ -714,16 +710,20 @@ progress = ProgressLogger()
 
 DISABLE_OPENMETEO_DOWNLOAD = False
 
+# Download the whole CITY_BBOX grid in 1 request (nearest grid cell per location)
+# instead of 1 request per location. Grid cells skip the per-location elevation
+# downscaling done by Open-Meteo for single coordinates.
+OPENMETEO_BBOX_DOWNLOAD = False
+
 # With ALL 29 parameters, each location eats around 20 api calls per trimester
 # 1 trimester = 58 locations * 20 calls = 1160 calls
 # Open-Meteo free tier = 600 calls per minute, 5000 calls per hour, 10000 calls per day
 # So we can download a full year at most every hour without hitting rate limits, 2 years max per day
+# The per-minute limit is paced by the client's token bucket (see OpenMeteoClient.ratelimit)
 
-# estimated api calls per request (with all parameters, per trimester)
-
-# Open-Meteo Estimation for all listed parameters and 1 full trimester (1 location):
-ESTIMATED_CALLS_PER_REQUEST = 20
-used_calls = 0
+# Columns kept in the final city dataset (None = all the Open-Meteo parameters)
+# e.g. ["location_id", "datetimeto_utc", "datetimeto_local", "temperature_2m", ...]
+PROJECTED_COLUMNS = None
 
 # ---------------------------------------------------------------------
 
@@ -742,247 +742,167 @@ used_calls = 0
 # print(df_weather)
 
 try:
-    all_logs = []
-    all_parquet_files = []
-
-    years = [2024]
-    for year in years:
-        # Get trimesters for the year
-        trimesters = get_trimestrial_periods(year)
-
-        yearly_parquet_files = []
-        for i, trimester in enumerate(trimesters):
-            # Skip trimesters (if already downloaded)
-            if year in [2024] and i in [0, 2]:
-                continue
-
-            start_time = time.perf_counter()
-
-            # ---------------------------------------------------------------------
-            # PREPARE the input parameters for the run/trimester
-
-            datetime_from = trimester[0]
-            datetime_to = trimester[1]
-            datetime_from_str = dt.fromisoformat(datetime_from).strftime("%Y-%m-%d")
-            datetime_to_str = dt.fromisoformat(datetime_to).strftime("%Y-%m-%d")
-
-            # Fix datetime if it's in the future (current ongoing trimester)
-            today = dt.now().date()
-            datetime_to_openmeteo = (
-                datetime_to_str
-                if dt.fromisoformat(datetime_to).date() <= today
-                else today.strftime("%Y-%m-%d")
-            )
-
-            # print()
-            # print(datetime_from_str)
-            # print(datetime_to_openmeteo)
-            # print()
-
-            run_id_prefix = f"{CITY_ID}_{year}_T{i + 1}"
-            run_id = f"{run_id_prefix}_{datetime_from_str}_{datetime_to_str}"
+    with hidden_cursor():
+        all_logs = []
 
-            logger.debug(
-                f"[{run_id_prefix.upper()}] Downloading weather data for {len(PERFECT_LOCATIONS)} locations..."
-            )
-            logger.trace(f"RUN_ID: {run_id}")
-            logger.trace(f"From: [{datetime_from_str}] to [{datetime_to_openmeteo}]")
-
-            progress.print(
-                f"Fetching weather data for {len(PERFECT_LOCATIONS)} locations..."
-            )
+        total_locations = len(LOCATIONS_IDS)  # loop invariant
+        today = date.today()
 
-            # ---------------------------------------------------------------------
-            # DOWNLOAD weather data for each location in the CITY_LOCATIONS
+        years = [2024]
+        for year in years:
+            # Get trimesters for the year
+            trimesters = get_trimester_specs(year)
 
-            i = 0
-            for location in PERFECT_LOCATIONS:
-                location_id = int(location["id"])
-                location_latitude = location["coordinates_latitude"]
-                location_longitude = location["coordinates_longitude"]
+            for trimester_number, trimester in enumerate(trimesters, start=1):
+                # Skip the trimesters that haven't started yet
+                # (the downloaded ones are skipped per location, see is_weather_cached)
+                if trimester.date_from > today:
+                    continue
 
-                progress.print(
-                    f"Downloading weather data (location_id={location_id})...",
-                    current_progress=i + 1,
-                    total_progress=len(PERFECT_LOCATIONS),
-                    prefix_msg=f"{i + 1}/{len(PERFECT_LOCATIONS)}",
-                    last=False,
-                )
-                if not DISABLE_OPENMETEO_DOWNLOAD:
-                    # TODO: Currently redownloading EVERYTHING for a whole trimester, until "today"
-                    df_weather = openmeteo.download_weather_data(
-                        run_id=run_id,
-                        location_id=location_id,
-                        latitude=location_latitude,
-                        longitude=location_longitude,
-                        start_date=datetime_from_str,
-                        end_date=datetime_to_openmeteo,
-                    )
-                    used_calls += ESTIMATED_CALLS_PER_REQUEST
+                start_time = time.perf_counter()
 
-                    # After 500 calls/25 requests, wait for a minute
-                    if used_calls >= 500:
-                        print()
-                        logger.trace(
-                            f"{hex('#dfa934')}WAIT{rst()}{grey()}: Waiting 70s to avoid rate limits (used {used_calls} requests)"
-                        )
-                        time.sleep(70)  # wait for 70 seconds
-                        used_calls = 0
-                # else:
-                #     time.sleep(0.1)  # simulate some delay for the download
+                # ---------------------------------------------------------------------
+                # PREPARE the input parameters for the run/trimester
 
-                if i >= (len(PERFECT_LOCATIONS) - 1):
-                    progress.print(
-                        f"Downloaded {i + 1} weather data in {exec_time(start_time, fmt=True)}",
-                        current_progress=i + 1,
-                        total_progress=len(PERFECT_LOCATIONS),
-                        prefix_msg=f"{i + 1}/{len(PERFECT_LOCATIONS)}",
-                        last=True,
-                    )
+                datetime_from_str = trimester.from_str
+                datetime_to_str = trimester.to_str
 
-                i += 1
+                # Fix datetime if it's in the future (current ongoing trimester)
+                datetime_to_openmeteo = trimester.to_capped_str(today)
 
-            # ---------------------------------------------------------------------
-            # SAVE PERIOD DATA:
+                # print()
+                # print(datetime_from_str)
+                # print(datetime_to_openmeteo)
+                # print()
 
-            if OpenMeteoClient.SAVE_TO_GCS and not DISABLE_OPENMETEO_DOWNLOAD:
-                save_start_time = time.perf_counter()
+                run_id_prefix = f"{CITY_ID}_{year}_T{trimester_number}"
+                # Nominal period end (NOT datetime_to_openmeteo): the ongoing trimester keeps
+                # the same run_id day after day, so its cached files are resumed, not refetched
+                # The parameters hash invalidates the cached files if the variables change
+                run_id = f"{run_id_prefix}_{datetime_from_str}_{datetime_to_str}_{PARAMETERS_HASH}"
 
+                logger.debug(
+                    f"[{run_id_prefix.upper()}] Downloading weather data for {total_locations} locations..."
+                )
+                logger.trace(f"RUN_ID: {run_id}")
                 logger.trace(
-                    f"GCS > BIGQUERY: transfering all files in GCS to Big Query for RUN_ID [{run_id}]..."
+                    f"From: [{datetime_from_str}] to [{datetime_to_openmeteo}]"
                 )
 
-                # Trigger the load to Big Query from GCS Parquet files
-                OpenMeteoHistoricalTable().transfer_all_data_to_bq()
-
-                # period_logs["gcs_saving_duration"] = exec_time(save_start_time, 2)
-                logger.debug(
-                    f"[GCS > BIGQUERY] Upserted all measurements from GCS to BigQuery in {exec_time(save_start_time, fmt=True)}"
+                progress.print(
+                    f"Fetching weather data for {total_locations} locations..."
                 )
 
-            # Generate the period file from all downloaded Parquet files for the run_id.
-            if OpenMeteoClient.SAVE_TO_DISK and not DISABLE_OPENMETEO_DOWNLOAD:
-                save_start_time = time.perf_counter()
+                # ---------------------------------------------------------------------
+                # DOWNLOAD weather data for each location in the CITY_LOCATIONS
 
-                logger.trace(
-                    f"DISK: creating a consolidated file on disk for RUN_ID [{run_id}]..."
-                )
+                if OPENMETEO_BBOX_DOWNLOAD and not DISABLE_OPENMETEO_DOWNLOAD:
+                    openmeteo.download_weather_data_from_bbox(
+                        run_id=run_id,
+                        location_ids=LOCATIONS_IDS,
+                        latitudes=LOCATIONS_LATITUDES,
+                        longitudes=LOCATIONS_LONGITUDES,
+                        bbox=CITY_BBOX,
+                        start_date=datetime_from_str,
+                        end_date=datetime_to_openmeteo,
+                    )
+                    progress.print(
+                        f"Downloaded {total_locations} weather data in {exec_time(start_time, fmt=True)}",
+                        current_progress=1,
+                        total_progress=1,
+                        last=True,
+                    )
 
-                # Retrieve all Parquet files for the run manually
-                parquet_files = get_parquet_filepaths(
-                    os.path.join(run_id, "openmeteo"), "*weather.raw.parquet"
-                )
-                if len(parquet_files) == 0:
-                    logger.warning(
-                        f"No parquet files found for run_id={run_id} in data/parquet/{run_id}/openmeteo/"
+                # 1 task per location, gated to MAX_CONCURRENT_LOCATIONS requests in flight
+                elif not DISABLE_OPENMETEO_DOWNLOAD:
+                    # Locations already on disk are skipped, the ongoing trimester only
+                    # requests the days after the last one downloaded
+                    asyncio.run(
+                        openmeteo.download_locations_weather_data_async(
+                            run_id=run_id,
+                            location_ids=LOCATIONS_IDS,
+                            latitudes=LOCATIONS_LATITUDES,
+                            longitudes=LOCATIONS_LONGITUDES,
+                            start_date=datetime_from_str,
+                            end_date=datetime_to_openmeteo,
+                            progress=progress,
+                        )
                     )
-                    print()
-                    continue
 
-                logger.trace(
-                    f"Found {len(parquet_files)} parquet files in data/parquet/{run_id}/openmeteo/*weather.raw.parquet"
-                )
+                # ---------------------------------------------------------------------
+                # SAVE PERIOD DATA:
 
-                # CONCATENATE into a TRIMESTER parquet file
-                concatenated_filename = f"{run_id}_weather.int.parquet"
-                trimester_parquet_file = concat_pq_to_pq(
-                    parquet_files,
-                    concatenated_filename,
-                    os.path.join(cfg.DATA_PARQUET_PATH, run_id, "openmeteo"),
+                # Nothing to transfer when the run has no file in the staging bucket
+                # (all locations cached and already transferred), listed from GCS so the
+                # files left by an interrupted run are transferred too
+                staged_blobs = (
+                    gcs.list_blob_names("staging", f"openmeteo/historical/{run_id}_")
+                    if OpenMeteoClient.SAVE_TO_GCS
+                    else []
                 )
-                # yearly_parquet_files.append(trimester_parquet_file)  # honestly pointless
-                all_parquet_files.append(trimester_parquet_file)
+                if OpenMeteoClient.SAVE_TO_GCS and len(staged_blobs) == 0:
+                    logger.trace(
+                        f"GCS > BIGQUERY: no staged files for RUN_ID [{run_id}], skipping the transfer"
+                    )
 
-                logger.trace(
-                    f"Concatenated all weather data in data/parquet/{run_id}/openmeteo/"
-                )
+                elif OpenMeteoClient.SAVE_TO_GCS and not DISABLE_OPENMETEO_DOWNLOAD:
+                    save_start_time = time.perf_counter()
 
-                # period_logs["disk_saving_duration"] = exec_time(save_start_time, 2)
-                logger.debug(
-                    f"[DISK] Created data/csv/{run_id}.raw.csv from {len(parquet_files)} parquet files in {exec_time(save_start_time, fmt=True)}"
-                )
+                    logger.trace(
+                        f"GCS > BIGQUERY: transfering {len(staged_blobs)} files in GCS to Big Query for RUN_ID [{run_id}]..."
+                    )
 
-            print()
+                    # Trigger the load to Big Query from GCS Parquet files
+                    OpenMeteoHistoricalTable().transfer_all_data_to_bq()
 
-            # END OF LOCATIONS LOOPS -----
+                    # period_logs["gcs_saving_duration"] = exec_time(save_start_time, 2)
+                    logger.debug(
+                        f"[GCS > BIGQUERY] Upserted all measurements from GCS to BigQuery in {exec_time(save_start_time, fmt=True)}"
+                    )
 
-        # END OF PERIOD/TRIMESTER LOOPS -----
+                print()
 
-    # END OF YEARS LOOPS -----
+                # END OF LOCATIONS LOOPS -----
 
-    # ---------------------------------------------------------------------
-    # CONCATENATE ALL FILES for the CITY into a single parquet file
+            # END OF PERIOD/TRIMESTER LOOPS -----
 
-    logger.debug(f"[{CITY_ID.upper()}] Concatenating ALL weather data for {CITY_ID}...")
+        # END OF YEARS LOOPS -----
 
-    if len(all_parquet_files) == 0:
-        logger.warning("No parquet files found.")
-        print()
+        # ---------------------------------------------------------------------
+        # WRITE ALL FILES for the CITY into a dataset partitioned by year/trimester
 
-    else:
-        concatenated_filename = f"{CITY_ID}_weather.int.parquet"
-        final_file = concat_pq_to_pq(
-            all_parquet_files,
-            concatenated_filename,
-            os.path.join(cfg.DATA_EXPORT_PATH),
+        logger.debug(
+            f"[{CITY_ID.upper()}] Writing ALL weather data for {CITY_ID} in a dataset..."
         )
 
-        logger.success(
-            f"[{CITY_ID.upper()}] Concatenated all weather data for {CITY_ID} in data/export/{concatenated_filename}"
+        # Discover the location files on disk (also the ones of previous/interrupted runs)
+        # Only the current parameters set: other hashes are stale downloads
+        # No intermediate trimester/year files: the dataset is streamed from these ones
+        all_parquet_files = sorted(
+            get_parquet_filepaths(
+                os.path.join(f"{CITY_ID}_*_{PARAMETERS_HASH}", "openmeteo"),
+                "*_weather.raw.parquet",
+            )
         )
 
-    # # OLD ARCHIVING OF THE PARQUET FILES PER YEAR THEN TOTAL
-
-    # # CONCATENATE all periods into a consolidated file
-    # logger.debug(
-    #     f"[{CITY_ID.upper()}_{year}] Concatenating weather data for {year}..."
-    # )
-
-    # if len(yearly_parquet_files) == 0:
-    #     logger.warning(f"No yearly parquet files for year={year}. Skipping...")
-    #     print()
-    #     continue
-
-    # concatenated_filename = f"{CITY_ID}_{year}_weather.int.parquet"
-    # year_parquet_file = concat_pq_to_pq(
-    #     yearly_parquet_files,
-    #     concatenated_filename,
-    #     os.path.join(cfg.DATA_EXPORT_PATH),
-    # )
-    # all_parquet_files.append(year_parquet_file)
-
-    # logger.success(
-    #     f"[{CITY_ID.upper()}_{year}] Concatenated all weather data from {year} in data/export/{concatenated_filename}"
-    # )
-    # print()
-
-    # # ---------------------------------------------------------------------
-    # # CONCATENATE ALL FILES for the CITY into a single parquet file
-    # logger.debug(f"[{CITY_ID.upper()}] Concatenating ALL weather data for {CITY_ID}...")
-
-    # parquet_files = get_parquet_filepaths(
-    #     os.path.join(cfg.DATA_EXPORT_PATH), f"{CITY_ID}_*_weather.int.parquet"
-    # )
-    # for file in parquet_files:
-    #     logger.trace(f"data/export/{file.split('/')[-1]}")
-
-    # concatenated_filename = f"{CITY_ID}_weather.int.parquet"
-    # city_parquet_file = concat_pq_to_pq(
-    #     parquet_files,
-    #     concatenated_filename,
-    #     os.path.join(cfg.DATA_EXPORT_PATH),
-    # )
-
-    # logger.success(
-    #     f"[{CITY_ID.upper()}] Concatenated all weather data for {CITY_ID} in data/export/{concatenated_filename}"
-    # )
+        if len(all_parquet_files) == 0:
+            logger.warning("No parquet files found.")
+            print()
+
+        else:
+            dataset_dirname = f"{CITY_ID}_weather"
+            final_dataset = write_pq_dataset(
+                all_parquet_files,
+                dataset_dirname,
+                cfg.DATA_EXPORT_PATH,
+                columns=PROJECTED_COLUMNS,
+            )
+
+            logger.success(
+                f"[{CITY_ID.upper()}] Wrote all weather data for {CITY_ID} in data/export/{dataset_dirname}/year=*/trimester=*/"
+            )
 
 except KeyboardInterrupt:
     print()
     logger.warning("Script interrupted by user.")
     print()
-
-finally:
-    # ALWAYS print the SHOW_CURSOR code before the script exits
-    sys.stdout.write(SHOW_CURSOR)
-    sys.stdout.flush()
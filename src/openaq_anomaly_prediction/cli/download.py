@@ -0,0 +1,199 @@
+"""Download OpenAQ measurements for an area (trimesters of whole years or a custom period)."""
+
+import argparse
+import datetime
+
+from openaq_anomaly_prediction.utils.helpers import get_trimestrial_periods
+from openaq_anomaly_prediction.utils.logger import hidden_cursor, logger
+
+# ---------------------------------------------------------------------
+# AREAS
+
+# Seoul LARGE: https://bboxfinder.com/#37.376705,126.678543,37.754973,127.282104
+# Seoul: https://bboxfinder.com/#37.439429,126.775360,37.693329,127.182884
+# Paris: https://bboxfinder.com/#48.749172,2.155380,48.962187,2.538872
+
+# TODO: CREATE A "PROJECT" CLASS/TABLE TO MANAGE THE ACTUAL LOCATIONS WE WANT TO REMEMBER, DOWNLOAD AND TRACK
+# Is supposed to replace both the hardcoded CITIES below, as well as store additional metadata about the area
+# e.g., population, area size, country, etc. but also which locations/sensors are used for the specific project
+
+CITIES = {
+    "seoul": {  # Seoul (large), small: 126.760597, 37.422799, 127.190437, 37.709356
+        "name": "Seoul",
+        "bbox": (126.678543, 37.376705, 127.282104, 37.754973),
+    },
+    "paris": {
+        "name": "Paris",
+        "bbox": (2.155380, 48.749172, 2.538872, 48.962187),
+    },
+    "new_delhi": {
+        "name": "New Delhi",
+        "bbox": (76.772461, 28.161110, 77.768372, 28.943516),
+    },
+    "los_angeles": {
+        "name": "Los Angeles",
+        "bbox": (-118.668153, 33.703935, -118.155358, 34.337306),
+    },
+    "nagoya": {
+        "name": "Nagoya",
+        "bbox": (136.822682, 35.058431, 137.050743, 35.233847),
+    },
+}
+
+
+# ---------------------------------------------------------------------
+# ARGUMENTS
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse the command line arguments."""
+
+    parser = argparse.ArgumentParser(
+        prog="openaq-download",
+        description="Download OpenAQ measurements for all the sensors of an area.",
+    )
+    parser.add_argument(
+        "--city",
+        default="seoul",
+        help=f"area id, also used in the run ids (known bboxes: {', '.join(CITIES)})",
+    )
+    parser.add_argument(
+        "--bbox",
+        type=lambda bbox: tuple(float(x) for x in bbox.split(",")),
+        default=None,
+        help="bounding box 'x1,y1,x2,y2' (lon/lat), overrides the city bbox",
+    )
+
+    period = parser.add_mutually_exclusive_group(required=True)
+    period.add_argument(
+        "--years",
+        type=lambda years: [int(year) for year in years.split(",")],
+        help="download all the trimesters of these years, e.g. 2021,2024,2025",
+    )
+    period.add_argument(
+        "--days",
+        type=int,
+        help="download the last N days (rolling window)",
+    )
+    period.add_argument(
+        "--from",
+        dest="datetime_from",
+        help="start of a custom period (ISO 8601), requires --to",
+    )
+    parser.add_argument(
+        "--to",
+        dest="datetime_to",
+        help="end of a custom period (ISO 8601)",
+    )
+    parser.add_argument(
+        "--label",
+        default=None,
+        help="run label of a custom period or rolling window (default: custom/daily)",
+    )
+
+    args = parser.parse_args(argv)
+
+    if args.bbox is None and args.city not in CITIES:
+        parser.error(f"unknown city '{args.city}': provide its --bbox")
+
+    if args.bbox is not None and len(args.bbox) != 4:
+        parser.error("--bbox must have 4 values: x1,y1,x2,y2")
+
+    if (args.datetime_from is None) != (args.datetime_to is None):
+        parser.error("--from and --to must be used together")
+
+    return args
+
+
+def get_periods(args: argparse.Namespace) -> list[dict]:
+    """Get the periods to download (download_period_from_area kwargs)."""
+
+    # Trimesters of whole years (flat list, dispatched concurrently)
+    if args.years is not None:
+        return [
+            {
+                "datetime_from": datetime_from,
+                "datetime_to": datetime_to,
+                "run_id_prefix": f"{args.city}_{year}_T{i + 1}",
+                "run_label": f"T{i + 1}/{year}",
+            }
+            for year in args.years
+            for i, (datetime_from, datetime_to) in enumerate(
+                get_trimestrial_periods(year)
+            )
+        ]
+
+    # Rolling window (no reason to NOT fetch the last 45 days: under 1000 records per sensor)
+    if args.days is not None:
+        run_label = args.label or "Daily"
+        now_utc = datetime.datetime.now(datetime.timezone.utc)
+        datetime_from = now_utc - datetime.timedelta(days=args.days)
+        return [
+            {
+                "datetime_from": datetime_from.isoformat(timespec="seconds"),
+                "datetime_to": now_utc.isoformat(timespec="seconds"),
+                "run_id_prefix": f"{args.city.lower()}_{run_label.lower()}",
+                "run_label": run_label,
+            }
+        ]
+
+    # Custom period
+    run_label = args.label or "custom"
+    return [
+        {
+            "datetime_from": args.datetime_from,
+            "datetime_to": args.datetime_to,
+            "run_id_prefix": f"{args.city.lower()}_{run_label.lower()}",
+            "run_label": run_label,
+        }
+    ]
+
+
+# ---------------------------------------------------------------------
+# MAIN
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Download the measurements of an area for the requested periods."""
+
+    args = parse_args(argv)
+
+    # Deferred: pulls the google cloud clients, not needed for --help or bad arguments
+    from openaq_anomaly_prediction.load.openaq import AreaDownloader
+
+    city_name = CITIES.get(args.city, {}).get("name", args.city)
+    city_bbox = args.bbox if args.bbox is not None else CITIES[args.city]["bbox"]
+
+    # LOCATIONS
+    city = AreaDownloader(area_id=args.city, area_name=city_name)
+    city.load_bbox(*city_bbox)
+
+    logger.info(f"Area: {city.area_id.upper()}")
+    logger.info(f"Locations: {city.locations.shape}")
+    logger.info(f"Sensors: {city.sensors.shape}")
+    print()
+
+    # --------------------------------------------------------------------------------------
+    # DOWNLOAD FROM OPENAQ API: Download measurements for filtered sensors in the date range
+
+    periods = get_periods(args)
+
+    try:
+        with hidden_cursor():
+            # Download all periods concurrently (I/O bound, rate limits are shared)
+            # Trimesters already completed in a previous run are skipped (see MANIFEST_PATH)
+            all_logs = city.download_periods_from_area(
+                periods, skip_downloaded=args.years is not None
+            )
+
+            # Summary of all download logs
+            AreaDownloader.print_period_logs(all_logs, True)
+
+    except KeyboardInterrupt:
+        print()
+        logger.warning("Script interrupted by user.")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,8 @@ from pathlib import Path
 from dotenv import load_dotenv
 
 _ROOT_PATH = Path(__file__).parent.parent.parent.parent
-load_dotenv(dotenv_path=_ROOT_PATH / "secrets" / ".env")
+_DOTENV_PATH = _ROOT_PATH / "secrets" / ".env"
+load_dotenv(dotenv_path=_DOTENV_PATH)  # once, see Configuration.reload_env
 # print(f"Config loaded from {_ROOT_PATH / 'secrets' / '.env'}: {os.environ}")
 
 # TODO: Get rid of this abomination, use OAuth instead
@@ -26,15 +27,21 @@ class Configuration:
     DATA_CSV_PATH = DATA_PATH / "csv"
     DATA_PARQUET_PATH = DATA_PATH / "parquet"
     DATA_EXPORT_PATH = DATA_PATH / "export"
-
-    os.makedirs(DATA_PATH, exist_ok=True)
-    os.makedirs(DATA_CSV_PATH, exist_ok=True)
-    os.makedirs(DATA_PARQUET_PATH, exist_ok=True)
-    os.makedirs(DATA_EXPORT_PATH, exist_ok=True)
+    DATA_CACHE_PATH = DATA_PATH / "cache"
 
     # Logs path
     LOGS_PATH = ROOT_PATH / "logs"
-    os.makedirs(LOGS_PATH, exist_ok=True)
+
+    # Created once at import, DATA_PATH comes with its subdirectories
+    for _dir_path in (
+        DATA_CSV_PATH,
+        DATA_PARQUET_PATH,
+        DATA_EXPORT_PATH,
+        DATA_CACHE_PATH,
+        LOGS_PATH,
+    ):
+        os.makedirs(_dir_path, exist_ok=True)
+    del _dir_path  # not a class attribute
 
     # BigQuery schemas
     BG_SCHEMA_PATH = (
@@ -52,9 +59,14 @@ class Configuration:
     @staticmethod
     def getenv(var_name: str) -> str:
         """Get environment variable by name."""
-        load_dotenv(dotenv_path=_ROOT_PATH / "secrets" / ".env")
+        # The .env file is loaded at import: no file parsing on the hot path (BaseTable())
         return os.environ.get(var_name, "default")
 
+    @staticmethod
+    def reload_env() -> None:
+        """Reload the variables of the .env file (e.g. after editing it in a notebook)."""
+        load_dotenv(dotenv_path=_DOTENV_PATH, override=True)
+
     # Doesn't work because a sensor can be bad only for a specific period
     @staticmethod
     def get_excluded_sensors() -> list[int]:
@@ -1,17 +1,32 @@
+import atexit
+import functools
 import io
+import itertools
 import os
+import string
+import tempfile
+import threading
 import time
-from typing import Any, Literal, Union, overload
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, ClassVar, Literal, Union, overload
 
+import google.auth
 import pandas as pd
+import pyarrow as pa
 import pyarrow.parquet as pq
-from google.cloud import bigquery, storage
+from google.cloud import bigquery, bigquery_storage, storage
 from google.cloud.bigquery.table import PrimaryKey, TableConstraints
-from google.cloud.exceptions import BadRequest, GoogleCloudError, NotFound
+from google.cloud.exceptions import GoogleCloudError, NotFound
 
 from openaq_anomaly_prediction.config import Configuration as cfg  # noqa: F401
 from openaq_anomaly_prediction.load.schemas.base_table import BaseTable
-from openaq_anomaly_prediction.utils.helpers import exec_time, format_duration
+from openaq_anomaly_prediction.utils.helpers import (
+    PARQUET_WRITE_OPTIONS,
+    concat_pq_to_pq,
+    exec_time,
+    format_duration,
+)
 from openaq_anomaly_prediction.utils.logger import ProgressLogger, logger
 
 GCS_BUCKETS = [
@@ -33,8 +48,50 @@ GCS_BUCKETS = [
 class CloudStorageClient:
     """Google Cloud Storage client wrapper."""
 
+    # Dataframes above this size are streamed to GCS (see stream_dataframe_to_gcs)
+    STREAM_MIN_BYTES = 64 * 1024 * 1024
+    STREAM_CHUNK_SIZE = 8 * 1024 * 1024  # multiple of 256 KiB
+
+    # Buckets already checked/created in this process (shared by all the instances)
+    _verified_buckets: ClassVar[set[str]] = set()
+
     def __init__(self):
         self.client = storage.Client()
+        self._batch_lock = threading.Lock()  # 1 batch at a time on the shared client
+
+    def _init_bucket(self, bucket_cfg: dict, verbose: int) -> None:
+        """Create a GCS bucket (with its policies) if it doesn't exist yet."""
+
+        project_id = self.client.project
+        bucket_name = f"{project_id}-{bucket_cfg.get('name')}"
+        full_bucket_name = f"gs://{bucket_name}"
+
+        try:
+            self.client.get_bucket(bucket_name)
+
+            if verbose >= 6:
+                logger.trace(f"Bucket already exists: {full_bucket_name}")
+        except NotFound:
+            bucket = self.client.create_bucket(
+                bucket_name, project=project_id, location="EU"
+            )
+
+            patched = False
+            if bucket_cfg.get("soft_delete_policy.duration", None) is not None:
+                bucket.soft_delete_policy.retention_duration_seconds = 0
+                patched = True
+
+            if bucket_cfg.get("lifecycle_rules", None) is not None:
+                bucket.lifecycle_rules = bucket_cfg["lifecycle_rules"]
+                patched = True
+
+            if patched:
+                bucket.patch()
+
+            if verbose >= 5:
+                logger.trace(f"Created Bucket: {full_bucket_name}")
+
+        CloudStorageClient._verified_buckets.add(bucket_name)
 
     def _init_buckets(self, **kwargs) -> None:
         """Initialize GCS buckets to reserve namespaces."""
@@ -46,34 +103,23 @@ class CloudStorageClient:
         if verbose >= 4:
             logger.debug(f"[GCS] Initializing GCS buckets for project: [{project_id}]")
 
-        for bucket_cfg in GCS_BUCKETS:
-            bucket_name = f"{project_id}-{bucket_cfg.get('name')}"
-            full_bucket_name = f"gs://{bucket_name}"
-
-            try:
-                self.client.get_bucket(bucket_name)
-
-                if verbose >= 6:
-                    logger.trace(f"Bucket already exists: {full_bucket_name}")
-            except NotFound:
-                bucket = self.client.create_bucket(
-                    bucket_name, project=project_id, location="EU"
-                )
-
-                patched = False
-                if bucket_cfg.get("soft_delete_policy.duration", None) is not None:
-                    bucket.soft_delete_policy.retention_duration_seconds = 0
-                    patched = True
-
-                if bucket_cfg.get("lifecycle_rules", None) is not None:
-                    bucket.lifecycle_rules = bucket_cfg["lifecycle_rules"]
-                    patched = True
-
-                if patched:
-                    bucket.patch()
+        bucket_cfgs = [
+            bucket_cfg
+            for bucket_cfg in GCS_BUCKETS
+            if f"{project_id}-{bucket_cfg.get('name')}"
+            not in CloudStorageClient._verified_buckets
+        ]
+        if len(bucket_cfgs) == 0:
+            return
 
-                if verbose >= 5:
-                    logger.trace(f"Created Bucket: {full_bucket_name}")
+        # 1 round trip per bucket: all the checks in parallel
+        with ThreadPoolExecutor(max_workers=len(bucket_cfgs)) as executor:
+            futures = [
+                executor.submit(self._init_bucket, bucket_cfg, verbose)
+                for bucket_cfg in bucket_cfgs
+            ]
+            for future in futures:
+                future.result()  # re-raise the first error
 
     def stream_dataframe_to_gcs(
         self, df: pd.DataFrame, bucket_name: str, blob_name: str
@@ -82,6 +128,26 @@ class CloudStorageClient:
 
         bucket_id = f"{self.client.project}-{bucket_name}"
 
+        # Large dataframes are streamed to a resumable upload (no full serialized copy in
+        # the RAM, chunks are sent while pyarrow is still encoding the next row groups)
+        if df.memory_usage(index=False).sum() >= CloudStorageClient.STREAM_MIN_BYTES:
+            blob = self.client.bucket(bucket_id).blob(blob_name)
+            with blob.open(
+                "wb",
+                chunk_size=CloudStorageClient.STREAM_CHUNK_SIZE,
+                content_type="application/octet-stream",
+                ignore_flush=True,  # pyarrow flushes, only close() finalizes the upload
+            ) as writer:
+                df.to_parquet(
+                    writer,
+                    index=False,
+                    engine="pyarrow",
+                    coerce_timestamps="us",  # forces microseconds
+                    allow_truncated_timestamps=True,
+                    **PARQUET_WRITE_OPTIONS,
+                )
+            return
+
         # Load the dataframe in the RAM (buffer)
         with io.BytesIO() as buffer:
             df.to_parquet(
@@ -90,51 +156,240 @@ class CloudStorageClient:
                 engine="pyarrow",
                 coerce_timestamps="us",  # forces microseconds
                 allow_truncated_timestamps=True,
+                **PARQUET_WRITE_OPTIONS,  # zstd: less bytes to upload and load in BigQuery
             )
 
             # Seek back to the start of the buffer so GCS can read it
             buffer.seek(0)
 
-            # Upload to GCS
+            # Upload to GCS: with a known size, files under 8 MiB are sent in 1 multipart
+            # request instead of a resumable upload session (2+ round trips)
             bucket = self.client.bucket(bucket_id)
             blob = bucket.blob(blob_name)
-            blob.upload_from_file(buffer, content_type="application/octet-stream")
+            blob.upload_from_file(
+                buffer,
+                size=buffer.getbuffer().nbytes,
+                content_type="application/octet-stream",
+            )
+
+    def stream_dataframes_to_gcs(
+        self, items: list[tuple[pd.DataFrame, str]], bucket_name: str, **kwargs
+    ) -> None:
+        """Stream multiple (dataframe, blob_name) to a GCS bucket concurrently."""
+
+        max_workers = kwargs.get("max_workers", 16)
+
+        # I/O bound: the serialization is short compared to the HTTP round trips
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(
+                    self.stream_dataframe_to_gcs, df, bucket_name, blob_name
+                )
+                for df, blob_name in items
+            ]
+            for future in futures:
+                future.result()  # re-raise the first upload error
+
+    def download_blobs(
+        self, bucket_name: str, prefix: str, output_path: str, **kwargs
+    ) -> list[str]:
+        """Download all the blobs of a prefix to a local directory concurrently (sorted paths)."""
+
+        max_workers = kwargs.get("max_workers", 16)
+
+        bucket_id = f"{self.client.project}-{bucket_name}"
+        blobs = list(self.client.bucket(bucket_id).list_blobs(prefix=prefix))
+        file_paths = [
+            os.path.join(output_path, os.path.basename(blob.name)) for blob in blobs
+        ]
+
+        # I/O bound: 1 HTTP download per blob
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(blob.download_to_filename, file_path)
+                for blob, file_path in zip(blobs, file_paths)
+            ]
+            for future in futures:
+                future.result()  # re-raise the first download error
+
+        return sorted(file_paths)
+
+    def list_blob_names(self, bucket_name: str, prefix: str) -> list[str]:
+        """List the names of the blobs of a prefix (1 listing request per 1000 blobs)."""
+
+        bucket_id = f"{self.client.project}-{bucket_name}"
+        return [
+            blob.name
+            for blob in self.client.bucket(bucket_id).list_blobs(prefix=prefix)
+        ]
 
     def clear_staging_bucket(self, prefix: str = "") -> None:
         """Deletes all objects in the staging bucket."""
 
         bucket_name = f"{self.client.project}-staging"
         bucket = self.client.bucket(bucket_name)
-        blobs = bucket.list_blobs(prefix=prefix)
+        blobs = iter(bucket.list_blobs(prefix=prefix))  # lazy pages of the listing
 
-        if blobs:
-            bucket.delete_blobs(list(blobs))
+        # 100 deletes per HTTP batch request (delete_blobs sends 1 request per blob)
+        # Serialized: the batch context is a stack on the (shared) client
+        while chunk := list(itertools.islice(blobs, 100)):
+            with self._batch_lock, self.client.batch():
+                for blob in chunk:
+                    blob.delete()
 
 
 # ============================================================================
 
 
+@functools.lru_cache(maxsize=128)
+def _build_merge_query(
+    target_table_id: str,
+    all_columns: tuple[str, ...],
+    merge_keys: tuple[str, ...],
+) -> string.Template:
+    """Build a BigQuery MERGE query template (cached), $staging_table_id is left to fill."""
+
+    # Sets: O(1) membership for wide schemas
+    merge_keys_set = frozenset(merge_keys)
+    meta_columns = frozenset(("ingested_at", "updated_at", "refreshed_at"))
+    immutable_columns = merge_keys_set | {"ingested_at"}
+
+    data_columns = [
+        col
+        for col in all_columns
+        if col not in merge_keys_set and col not in meta_columns
+    ]
+
+    # Quoted identifiers: the column names come from the schema, never parsed as SQL
+    def quoted(col: str) -> str:
+        return f"`{col}`"
+
+    # MERGE ON: primary keys
+    join_condition = " AND ".join(
+        [f"target.{quoted(pk)} = staged.{quoted(pk)}" for pk in merge_keys]
+    )
+
+    # MATCHED WITH CHANGES: update all columns except "id" and "ingested_at"
+    change_condition = " OR ".join(
+        [
+            f"target.{quoted(col)} IS DISTINCT FROM staged.{quoted(col)}"
+            for col in data_columns
+        ]  # check all except primary keys and meta columns
+    )
+    full_update = ", ".join(
+        [
+            f"target.{quoted(col)} = staged.{quoted(col)}"
+            for col in all_columns
+            if col not in immutable_columns
+        ]  # update all except primary keys and ingested_at
+    )
+
+    # MATCHED WITHOUT CHANGES: update only "refreshed_at" field
+    refreshed_update = "target.`refreshed_at` = staged.`refreshed_at`"
+
+    # NOT MATCHED: insert new row
+    insert_cols = ", ".join([quoted(col) for col in all_columns])
+    insert_vals = ", ".join([f"staged.{quoted(col)}" for col in all_columns])
+
+    # Only $staging_table_id is left to fill (BigQuery identifiers have no "$")
+    merge_query = f"""
+        MERGE `{target_table_id}` target
+        USING `$staging_table_id` staged
+        ON {join_condition}
+
+        -- MATCHED WITH CHANGES: update all columns except "id" and "ingested_at"
+        WHEN MATCHED AND ({change_condition}) THEN
+            UPDATE SET {full_update}
+
+        -- MATCHED WITHOUT CHANGES: update "refreshed_at" field
+        WHEN MATCHED THEN
+            UPDATE SET {refreshed_update}
+
+        -- NOT MATCHED: insert new row
+        WHEN NOT MATCHED THEN
+            INSERT ({insert_cols}) VALUES ({insert_vals})
+    """
+
+    return string.Template(merge_query)
+
+
 class BigQueryClient:
     """BigQuery client wrapper."""
 
+    # Larger dataframes are staged in GCS as Parquet shards before the MERGE
+    UPSERT_GCS_MIN_ROWS = 100_000
+    UPSERT_GCS_SHARD_ROWS = 100_000
+
+    # Row groups of the local exports (see export_table_to_disk)
+    EXPORT_ROW_GROUP_BYTES = 64 * 1024 * 1024
+    EXPORT_ROW_GROUP_ROWS = 1_000_000
+
     def __init__(self):
-        self.client = bigquery.Client(location="EU")
+        # Application default credentials, kept for the other clients (see get_bqstorage_client)
+        self.credentials, project_id = google.auth.default()
+        self.client = bigquery.Client(
+            project=project_id, credentials=self.credentials, location="EU"
+        )
+
+        # Storage Read API client: created once (gRPC channel), on the first read
+        self._bqstorage_client = None
+        self._bqstorage_lock = threading.Lock()  # reads can come from several threads
 
+        # Datasets/tables already checked or created (skips the get_* round trips)
+        self._known_datasets: set[str] = set()
+        self._known_tables: set[str] = set()
+        self._listed_datasets = False  # existing datasets listed in 1 call (lazily)
+        self._listed_tables: set[str] = set()  # datasets whose tables were listed
+
+        # Background clean ups (no data dependency with the caller), finished at exit
+        self._cleanup_pool = ThreadPoolExecutor(max_workers=4)
+        atexit.register(self._cleanup_pool.shutdown, wait=True)
+
+    def _submit_cleanup(self, func, *args, **kwargs) -> Future:
+        """Run a clean up call in the background (errors are logged, not raised)."""
+
+        def _log_error(future: Future) -> None:
+            if future.exception() is not None:
+                logger.warning(
+                    f"Background clean up {func.__name__} failed: {future.exception()}"
+                )
+
+        future = self._cleanup_pool.submit(func, *args, **kwargs)
+        future.add_done_callback(_log_error)
+        return future
+
+    def get_bqstorage_client(self) -> bigquery_storage.BigQueryReadClient:
+        """Get the (shared) BigQuery Storage Read API client of the query results."""
+
+        with self._bqstorage_lock:
+            if self._bqstorage_client is None:
+                # Same credentials as the BigQuery client (no second ADC discovery)
+                self._bqstorage_client = bigquery_storage.BigQueryReadClient(
+                    credentials=self.credentials
+                )
+
+        return self._bqstorage_client
+
+    # Most specific first: the DataFrame overload also matches any other kwargs
     @overload
-    def query(self, query: str, **kwargs: Any) -> Any: ...
+    def query(self, query: str, *, dry_run: Literal[True], **kwargs: Any) -> None: ...
 
     @overload
     def query(
-        self, query: str, *, dry_run: Literal[False] = False, **kwargs: Any
-    ) -> pd.DataFrame: ...
+        self, query: str, *, to_arrow: Literal[True], **kwargs: Any
+    ) -> pa.Table: ...
 
     @overload
-    def query(self, query: str, *, dry_run: Literal[True], **kwargs: Any) -> None: ...
+    def query(
+        self, query: str, *, dry_run: Literal[False] = False, **kwargs: Any
+    ) -> pd.DataFrame: ...
 
-    def query(self, query: str, **kwargs) -> Union[pd.DataFrame, None]:
+    def query(self, query: str, **kwargs) -> Union[pd.DataFrame, pa.Table, None]:
         dry_run = kwargs.get("dry_run", False)
         query_cache = kwargs.get("query_cache", True)
         query_parameters = kwargs.get("query_parameters", None)
+        maximum_bytes_billed = kwargs.get("maximum_bytes_billed", None)  # cost guard
+        job_id_prefix = kwargs.get("job_id_prefix", "openaq-")
 
         query_parameters_fmt = []
         if query_parameters is not None:
@@ -153,8 +408,11 @@ class BigQueryClient:
                 dry_run=dry_run,
                 use_query_cache=query_cache,
                 query_parameters=query_parameters_fmt,
+                maximum_bytes_billed=maximum_bytes_billed,
+            )
+            query_job = self.client.query(
+                query, job_config=job_config, job_id_prefix=job_id_prefix
             )
-            query_job = self.client.query(query, job_config=job_config)
 
             if dry_run:
                 print(
@@ -162,7 +420,14 @@ class BigQueryClient:
                 )
                 return None
 
-            return query_job.result().to_dataframe(create_bqstorage_client=True)
+            if kwargs.get("to_arrow", False):
+                return query_job.result().to_arrow(
+                    bqstorage_client=self.get_bqstorage_client()
+                )
+
+            return query_job.result().to_dataframe(
+                bqstorage_client=self.get_bqstorage_client()
+            )
 
         except GoogleCloudError as e:
             error = "BigQuery Error: "
@@ -195,12 +460,68 @@ class BigQueryClient:
         #     ("test_locations_ids", "STRING", ["12", "34", "56"]),
         # ]
         # df = bq.query(query, query_parameters=query_parameters, dry_run=False)
+        # Or: df = bq.query_ids(query, ["12", "34", "56"], ids_parameter="test_locations_ids")
+
+    def query_ids(
+        self, query: str, ids: list[int] | list[str], **kwargs
+    ) -> Union[pd.DataFrame, pa.Table, None]:
+        """Run a query filtered on a list of ids passed as an array parameter (@ids)."""
+
+        # The ids are never interpolated in the SQL: the same text for any list of ids
+        # keeps the query cached (IN UNNEST(@ids) instead of IN (1, 2, 3))
+        ids_parameter = kwargs.pop("ids_parameter", "ids")
+        query_parameters = kwargs.pop("query_parameters", None) or []
+
+        ids = list(ids)
+        ids_type = "INT64" if all(isinstance(value, int) for value in ids) else "STRING"
+
+        return self.query(
+            query,
+            query_parameters=[(ids_parameter, ids_type, ids), *query_parameters],
+            **kwargs,
+        )
+
+    def list_known_datasets(self) -> None:
+        """Add all the existing datasets to the known datasets (1 call instead of 1 per dataset)."""
+
+        if self._listed_datasets:
+            return
+
+        # Not fatal (e.g. no list permission): the get_dataset probes still work
+        try:
+            self._known_datasets |= {
+                dataset.dataset_id for dataset in self.client.list_datasets()
+            }
+        except GoogleCloudError as e:
+            logger.trace(f"Could not list the datasets: {e}")
+
+        self._listed_datasets = True
+
+    def list_known_tables(self, dataset_id: str) -> None:
+        """Add all the existing tables of a dataset ('project.dataset') to the known tables."""
+
+        if dataset_id in self._listed_tables:
+            return
+
+        try:
+            self._known_tables |= {
+                f"{table.project}.{table.dataset_id}.{table.table_id}"
+                for table in self.client.list_tables(dataset_id)
+            }
+        except GoogleCloudError as e:
+            logger.trace(f"Could not list the tables of [{dataset_id}]: {e}")
+
+        self._listed_tables.add(dataset_id)
 
     def create_dataset_if_not_exists(self, dataset_id: str, **kwargs) -> None:
         """Create a BigQuery dataset if it does not exist."""
 
         verbose = kwargs.get("verbose", 5)
 
+        self.list_known_datasets()
+        if dataset_id in self._known_datasets:
+            return
+
         start_time = time.perf_counter()
 
         # GOOGLE_PROJECT_ID = cfg.getenv("GOOGLE_PROJECT_ID")
@@ -225,6 +546,8 @@ class BigQueryClient:
                     f"Created dataset: [{self.client.project}.{dataset.dataset_id}] in {exec_time(start_time, fmt=True)}"
                 )
 
+        self._known_datasets.add(dataset_id)
+
     def create_table_if_not_exists(self, table: BaseTable, **kwargs) -> None:
         """Create the BigQuery table if it does not exist."""
 
@@ -236,9 +559,17 @@ class BigQueryClient:
         if table.dataset_id is None or table.table_id is None or table.schema is None:
             raise ValueError("Table ID and schema must be defined.")
 
+        if table_id in self._known_tables:
+            return
+
         # Ensure dataset exists
         self.create_dataset_if_not_exists(table.dataset_id)
 
+        # All the tables of the dataset in 1 call (then no get_table per table)
+        self.list_known_tables(f"{table.project_id}.{table.dataset_id}")
+        if table_id in self._known_tables:
+            return
+
         try:
             # Check if table exists
             found_table = self.client.get_table(table_id)  # Make an API request.
@@ -272,6 +603,8 @@ class BigQueryClient:
                     f"Created table: [{self.client.project}.{created_table.dataset_id}.{created_table.table_id}] in {exec_time(start_time, fmt=True)}"
                 )
 
+        self._known_tables.add(table_id)
+
     def load_dataframe_to_bq(
         self, df: pd.DataFrame, table: BaseTable, **kwargs
     ) -> None:
@@ -280,14 +613,16 @@ class BigQueryClient:
         verbose = kwargs.get("verbose", 6)
         mode = kwargs.get("mode", "truncate")
         table_id = kwargs.get("table_id", table.get_full_table_id())
+        create_table = kwargs.get("create_table", True)
 
         start_time = time.perf_counter()
 
         if mode not in ["append", "truncate"]:
             raise ValueError("Mode must be either 'append' or 'truncate'.")
 
-        # Ensure table exists
-        self.create_table_if_not_exists(table, table_id=table_id)
+        # Ensure table exists (NOT for the staging tables: the load creates them)
+        if create_table:
+            self.create_table_if_not_exists(table, table_id=table_id)
 
         # EXECUTE THE LOAD QUERY ---------------------------------------------
 
@@ -297,10 +632,16 @@ class BigQueryClient:
             if mode == "truncate"
             else "WRITE_APPEND",
             schema=table.schema,
-            # source_format=bigquery.SourceFormat.PARQUET, # Needed?
+            # Explicit: never the CSV fallback (slower, loses the datetime types)
+            source_format=bigquery.SourceFormat.PARQUET,
         )
 
-        job = self.client.load_table_from_dataframe(df, table_id, job_config=job_config)
+        job = self.client.load_table_from_dataframe(
+            df,
+            table_id,
+            job_config=job_config,
+            parquet_compression="snappy",  # temporary file: fastest to encode
+        )
         job.result()  # Wait for the load to finish
 
         if verbose >= 5:
@@ -314,14 +655,16 @@ class BigQueryClient:
         verbose = kwargs.get("verbose", 6)
         mode = kwargs.get("mode", "truncate")
         table_id = kwargs.get("table_id", table.get_full_table_id())
+        create_table = kwargs.get("create_table", True)
 
         start_time = time.perf_counter()
 
         if mode not in ["append", "truncate"]:
             raise ValueError("Mode must be either 'append' or 'truncate'.")
 
-        # Ensure table exists
-        self.create_table_if_not_exists(table, table_id=table_id)
+        # Ensure table exists (NOT for the staging tables: the load creates them)
+        if create_table:
+            self.create_table_if_not_exists(table, table_id=table_id)
 
         # EXECUTE THE LOAD QUERY ---------------------------------------------
         job_config = bigquery.LoadJobConfig(
@@ -340,11 +683,20 @@ class BigQueryClient:
                 f"Loaded dataframe in [{table_id}] in {exec_time(start_time, fmt=True)}"
             )
 
-    def get_staging_table_id(self, target_table_id: str) -> str:
-        """Get the staging table ID for a given target table ID."""
-        return f"{target_table_id}_staged"
+    def get_staging_table_id(
+        self, target_table_id: str, suffix: str | None = None
+    ) -> str:
+        """Get the staging table ID for a given target table ID (and upsert suffix)."""
+        if suffix is None:
+            return f"{target_table_id}_staged"
+        return f"{target_table_id}_staged_{suffix}"
 
-    def generate_merge_query(self, table: BaseTable, merge_keys: list[str]) -> str:
+    def generate_merge_query(
+        self,
+        table: BaseTable,
+        merge_keys: list[str],
+        staging_table_id: str | None = None,
+    ) -> str:
         """Generate a BigQuery MERGE query string."""
 
         if table.schema is None:
@@ -352,63 +704,17 @@ class BigQueryClient:
 
         # INIT ---------------------------------------------------------------
         target_table_id = table.get_full_table_id()
-        staging_table_id = self.get_staging_table_id(target_table_id)
-
-        all_columns = [field.name for field in table.schema]
-        meta_columns = ["ingested_at", "updated_at", "refreshed_at"]
-        immutable_columns = merge_keys + ["ingested_at"]
-
-        data_columns = [
-            col
-            for col in all_columns
-            if col not in merge_keys and col not in meta_columns
-        ]
-
-        # MERGE ON: primary keys
-        join_condition = " AND ".join(
-            [f"target.{pk} = staged.{pk}" for pk in merge_keys]
+        if staging_table_id is None:
+            staging_table_id = self.get_staging_table_id(target_table_id)
+
+        # The template is cached per table/schema, only the staging table changes
+        merge_query = _build_merge_query(
+            target_table_id,
+            tuple(field.name for field in table.schema),
+            tuple(merge_keys),
         )
 
-        # MATCHED WITH CHANGES: update all columns except "id" and "ingested_at"
-        change_condition = " OR ".join(
-            [
-                f"target.{col} IS DISTINCT FROM staged.{col}" for col in data_columns
-            ]  # check all except primary keys and meta columns
-        )
-        full_update = ", ".join(
-            [
-                f"target.{col} = staged.{col}"
-                for col in all_columns
-                if col not in immutable_columns
-            ]  # update all except primary keys and ingested_at
-        )
-
-        # MATCHED WITHOUT CHANGES: update only "refreshed_at" field
-        refreshed_update = "target.refreshed_at = staged.refreshed_at"
-
-        # NOT MATCHED: insert new row
-        insert_cols = ", ".join(all_columns)
-        insert_vals = ", ".join([f"staged.{col}" for col in all_columns])
-
-        merge_query = f"""
-            MERGE `{target_table_id}` target
-            USING `{staging_table_id}` staged
-            ON {join_condition}
-
-            -- MATCHED WITH CHANGES: update all columns except "id" and "ingested_at"
-            WHEN MATCHED AND ({change_condition}) THEN
-                UPDATE SET {full_update}
-
-            -- MATCHED WITHOUT CHANGES: update "refreshed_at" field
-            WHEN MATCHED THEN
-                UPDATE SET {refreshed_update}
-
-            -- NOT MATCHED: insert new row
-            WHEN NOT MATCHED THEN
-                INSERT ({insert_cols}) VALUES ({insert_vals})
-        """
-
-        return merge_query
+        return merge_query.substitute(staging_table_id=staging_table_id)
 
     def upsert_data(
         self,
@@ -423,6 +729,7 @@ class BigQueryClient:
 
         verbose = kwargs.get("verbose", 6)
         debug_inline = kwargs.get("debug_inline", True)
+        wait_cleanup = kwargs.get("wait_cleanup", False)
 
         if df is None and bucket_uri == "":
             raise ValueError("Either df or bucket_uri must be provided.")
@@ -437,11 +744,46 @@ class BigQueryClient:
             logger.warning("Upsert skipped: DataFrame is empty.")
             return
 
+        # LARGE DATAFRAMES: parallel shard uploads + 1 load job from the bucket
+        # (the staging bucket path, instead of a single synchronous dataframe upload)
+        if df is not None and len(df) > BigQueryClient.UPSERT_GCS_MIN_ROWS:
+            shards_prefix = f"upserts/{table.table_id}/{uuid.uuid4().hex}"
+            shard_rows = BigQueryClient.UPSERT_GCS_SHARD_ROWS
+            gcs.stream_dataframes_to_gcs(
+                [
+                    (
+                        df.iloc[start : start + shard_rows],
+                        f"{shards_prefix}/part-{start // shard_rows:05d}.parquet",
+                    )
+                    for start in range(0, len(df), shard_rows)
+                ],
+                "staging",
+                max_workers=8,
+            )
+
+            # The shards are cleared by the upsert (its bucket clean up), or here if it failed
+            try:
+                self.upsert_data(
+                    table,
+                    merge_keys,
+                    bucket_uri=f"gs://{gcs.client.project}-staging",
+                    prefix_uri=shards_prefix,
+                    **kwargs,
+                )
+            except Exception:
+                gcs.clear_staging_bucket(prefix=shards_prefix)
+                raise
+            return
+
         start_time = time.perf_counter()
 
         # INIT ---------------------------------------------------------------
         target_table_id = table.get_full_table_id()
-        staging_table_id = self.get_staging_table_id(target_table_id)
+
+        # 1 staging table per upsert: concurrent upserts never load into the same one
+        staging_table_id = self.get_staging_table_id(
+            target_table_id, uuid.uuid4().hex[:8]
+        )
 
         self.create_table_if_not_exists(table)  # Ensure target table exists
 
@@ -453,13 +795,15 @@ class BigQueryClient:
             logger.debug(f"Starting upsert of data from bucket_uri [{bucket_uri}]...")
 
         # GENERATE THE MERGE QUERY -------------------------------------------
-        merge_query = self.generate_merge_query(table, merge_keys)
+        merge_query = self.generate_merge_query(table, merge_keys, staging_table_id)
         # print(merge_query)
 
         # LOAD THE STAGING TABLE ---------------------------------------------
         # From dataframe
         if df is not None:
-            self.load_dataframe_to_bq(df, table=table, table_id=staging_table_id)
+            self.load_dataframe_to_bq(
+                df, table=table, table_id=staging_table_id, create_table=False
+            )
 
         # From GCS bucket (staging)
         elif bucket_uri != "":
@@ -468,7 +812,9 @@ class BigQueryClient:
                 if prefix_uri != ""
                 else f"{bucket_uri}/*.parquet"
             )
-            self.load_bucket_to_bq(full_uri, table=table, table_id=staging_table_id)
+            self.load_bucket_to_bq(
+                full_uri, table=table, table_id=staging_table_id, create_table=False
+            )
 
         # EXECUTE THE MERGE QUERY --------------------------------------------
         query_time = time.perf_counter()
@@ -486,16 +832,19 @@ class BigQueryClient:
             )
 
         # CLEAN UP -----------------------------------------------------------
-        deleted_time = time.perf_counter()
 
-        # Delete the staging table
-        self.client.delete_table(staging_table_id, not_found_ok=True)
+        # Delete the staging table in the background (unique to this upsert)
+        cleanup = self._submit_cleanup(
+            self.client.delete_table, staging_table_id, not_found_ok=True
+        )
+        self._known_tables.discard(staging_table_id)
+        if wait_cleanup:
+            cleanup.result()
         if verbose >= 6:
-            logger.trace(
-                f"Deleted the staging table [{staging_table_id}] in {exec_time(deleted_time, fmt=True)}"
-            )
+            logger.trace(f"Deleting the staging table [{staging_table_id}]...")
 
         # Delete the staging files from GCS if applicable
+        # NOT in the background: the prefix is shared with the next uploads of the caller
         if bucket_uri != "":
             deleted_time = time.perf_counter()
             gcs.clear_staging_bucket(prefix=prefix_uri)
@@ -520,9 +869,11 @@ class BigQueryClient:
     ) -> None:
         """Export a BigQuery query to a local parquet file."""
 
+        export_via_gcs = kwargs.get("export_via_gcs", False)  # large exports
+
         start_time = time.perf_counter()
 
-        query_job = bq.client.query(
+        query_job = self.client.query(
             query,
             job_config=bigquery.QueryJobConfig(dry_run=dry_run, use_query_cache=True),
         )
@@ -533,12 +884,22 @@ class BigQueryClient:
                 f"This query will process {query_job.total_bytes_processed / 10**6:.2f} MB. If you want to execute it, set dry_run=False."
             )
 
+        elif export_via_gcs:
+            logger.info(f"Executed the query in {format_duration(query_time)}")
+            self.export_query_via_gcs(query_job, filename)
+
+            logger.success(
+                f"Exported the BigQuery table to a local file in {exec_time(start_time, fmt=True)}"
+            )
+
         else:
             logger.info(f"Executed the query in {format_duration(query_time)}")
             # This is slow AF, but it works, so we'll go with it for now
-            # We should really use GCS for this though
+            # Large exports: use export_via_gcs=True (EXTRACT job + parallel downloads)
             result_iterator = query_job.result()
-            iterable = result_iterator.to_arrow_iterable()
+            iterable = result_iterator.to_arrow_iterable(
+                bqstorage_client=self.get_bqstorage_client()
+            )
 
             export_path = os.path.join(cfg.DATA_EXPORT_PATH, filename)
             logger.debug(f"Exporting the BigQuery table to [{filename}]...")
@@ -546,13 +907,28 @@ class BigQueryClient:
             writer = None
             current_rows = 0
             total_rows = result_iterator.total_rows
-            progress = ProgressLogger()
+            progress = ProgressLogger(min_interval=0.5)
+
+            # The Storage API streams small batches: buffered into large row groups
+            buffered_batches = []
+            buffered_bytes = 0
             for batch in iterable:
                 if writer is None:
                     # Initialize the writer with the schema from the first batch
-                    writer = pq.ParquetWriter(export_path, batch.schema)
+                    writer = pq.ParquetWriter(
+                        export_path, batch.schema, **PARQUET_WRITE_OPTIONS
+                    )
+
+                buffered_batches.append(batch)
+                buffered_bytes += batch.nbytes
+                if buffered_bytes >= BigQueryClient.EXPORT_ROW_GROUP_BYTES:
+                    writer.write_table(
+                        pa.Table.from_batches(buffered_batches),
+                        row_group_size=BigQueryClient.EXPORT_ROW_GROUP_ROWS,
+                    )
+                    buffered_batches = []
+                    buffered_bytes = 0
 
-                writer.write_batch(batch)
                 current_rows += batch.num_rows
 
                 progress.print(
@@ -563,12 +939,50 @@ class BigQueryClient:
                     last=(current_rows >= total_rows),
                 )
 
+            if writer:
+                if len(buffered_batches) > 0:
+                    writer.write_table(
+                        pa.Table.from_batches(buffered_batches),
+                        row_group_size=BigQueryClient.EXPORT_ROW_GROUP_ROWS,
+                    )
+                writer.close()
+
             logger.success(
                 f"Exported the BigQuery table to a local file in {exec_time(start_time, fmt=True)}"
             )
 
-            if writer:
-                writer.close()
+    def export_query_via_gcs(self, query_job: bigquery.QueryJob, filename: str) -> None:
+        """Export the results of a query to a local parquet file with an EXTRACT job to GCS."""
+
+        query_job.result()  # wait for the results (destination table)
+
+        # Sharded by BigQuery's export workers, under a unique prefix of the staging bucket
+        prefix = f"exports/{uuid.uuid4().hex}/"
+        stem = os.path.splitext(os.path.basename(filename))[0]
+        destination_uri = f"gs://{self.client.project}-staging/{prefix}{stem}-*.parquet"
+
+        try:
+            # The anonymous destination table of the query results (no temp table)
+            logger.debug(f"Extracting the query results to [{destination_uri}]...")
+            extract_job = self.client.extract_table(
+                query_job.destination,
+                destination_uri,
+                job_config=bigquery.ExtractJobConfig(
+                    destination_format=bigquery.DestinationFormat.PARQUET,
+                    compression=bigquery.Compression.SNAPPY,
+                ),
+            )
+            extract_job.result()
+
+            # Download the shards concurrently, then 1 local file (row group streaming)
+            logger.debug(f"Downloading the shards to [{filename}]...")
+            with tempfile.TemporaryDirectory(dir=cfg.DATA_EXPORT_PATH) as shards_path:
+                files = gcs.download_blobs("staging", prefix, shards_path)
+                concat_pq_to_pq(files, filename, cfg.DATA_EXPORT_PATH)
+
+        finally:
+            # Unique prefix: deleted once downloaded (synchronously, see clear_staging_bucket)
+            gcs.clear_staging_bucket(prefix=prefix)
 
 
 # ============================================================================
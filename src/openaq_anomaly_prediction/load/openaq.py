@@ -1,16 +1,26 @@
+import functools
+import hashlib
+import io
+import json
 import os
 import random
+import threading
 import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from datetime import date
 from datetime import datetime as dt
 from pathlib import Path
-from pprint import pprint
 from typing import Any, Union
 
 import numpy as np
 import pandas as pd
-import pyarrow.parquet as pq
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.json as pajson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry, make_headers
 
 # pandas typing aliases from their codebase (for date types hints)
 from pandas._typing import (
@@ -18,26 +28,27 @@ from pandas._typing import (
     # ArrayLike,
     # DateTimeErrorChoices,
 )
-from shapely import length
 
 from openaq_anomaly_prediction.config import Configuration as config  # noqa: F401
-from openaq_anomaly_prediction.load.gcp import bq, gcs
+from openaq_anomaly_prediction.load.gcp import gcs
 from openaq_anomaly_prediction.load.schemas.openaq_locations import OpenAQLocationsTable
 from openaq_anomaly_prediction.load.schemas.openaq_measurements import (
     OpenAQMeasurementsTable,
 )
 from openaq_anomaly_prediction.load.schemas.openaq_sensors import OpenAQSensorsTable
 from openaq_anomaly_prediction.utils.helpers import (
+    concat_pq_to_pq,
     exec_time,
     format_duration,
     get_iso_now,
     get_parquet_filepaths,
-    parquets_to_csv,
+    get_parquet_write_options,
+    read_manifest,
     save_logs,
+    write_manifest,
 )
 from openaq_anomaly_prediction.utils.logger import (
     ProgressLogger,
-    b,
     grey,
     hex,
     logger,
@@ -48,10 +59,84 @@ ArrayConvertible = Union[list, tuple, AnyArrayLike]
 Scalar = Union[float, str]
 DatetimeScalar = Union[Scalar, date, np.datetime64]
 
+# Fixed Arrow schema of the hourly measurements (skip type inference on every page)
+# Datetimes are kept as ISO strings: they are parsed with their offsets in sanitize_dataframe
+_OPENAQ_DATETIME = pa.struct([("utc", pa.string()), ("local", pa.string())])
+OPENAQ_MEASUREMENTS_SCHEMA = pa.schema(
+    [
+        ("value", pa.float64()),
+        ("flagInfo", pa.struct([("hasFlags", pa.bool_())])),
+        (
+            "parameter",
+            pa.struct(
+                [
+                    ("id", pa.int64()),
+                    ("name", pa.string()),
+                    ("units", pa.string()),
+                    ("displayName", pa.string()),
+                ]
+            ),
+        ),
+        (
+            "period",
+            pa.struct(
+                [
+                    ("label", pa.string()),
+                    ("interval", pa.string()),
+                    ("datetimeFrom", _OPENAQ_DATETIME),
+                    ("datetimeTo", _OPENAQ_DATETIME),
+                ]
+            ),
+        ),
+        (
+            "coordinates",
+            pa.struct([("latitude", pa.float64()), ("longitude", pa.float64())]),
+        ),
+        (
+            "summary",
+            pa.struct(
+                [
+                    (stat, pa.float64())
+                    for stat in [
+                        "min",
+                        "q02",
+                        "q25",
+                        "median",
+                        "q75",
+                        "q98",
+                        "max",
+                        "avg",
+                        "sd",
+                    ]
+                ]
+            ),
+        ),
+        (
+            "coverage",
+            pa.struct(
+                [
+                    ("expectedCount", pa.int64()),
+                    ("expectedInterval", pa.string()),
+                    ("observedCount", pa.int64()),
+                    ("observedInterval", pa.string()),
+                    ("percentComplete", pa.float64()),
+                    ("percentCoverage", pa.float64()),
+                    ("datetimeFrom", _OPENAQ_DATETIME),
+                    ("datetimeTo", _OPENAQ_DATETIME),
+                ]
+            ),
+        ),
+    ]
+)
+
 
 class OpenAQClient:
     """OpenAQ API client wrapper."""
 
+    # Keep-alive connections kept by the session: 1 per concurrent request of the
+    # downloader (periods x sensors x pages), extra ones would be closed after use
+    POOL_MAXSIZE = 64
+
     def __init__(self, **kwargs) -> None:
         # KEYWORDS ARGUMENTS
         self.verbose = kwargs.get("verbose", 0)
@@ -63,6 +148,39 @@ class OpenAQClient:
         self.ratelimit_used = -1
         self.ratelimit_remaining = -1
         self.ratelimit_reset = -1
+        self._ratelimit_lock = threading.Lock()  # shared between download threads
+        self._next_call_at = 0.0  # time.monotonic() of the next paced call
+        self._in_flight = 0  # sent requests not counted in the rate limit headers yet
+
+        # HTTP SESSION: 1 pool of keep-alive connections shared by all threads
+        self.session = requests.Session()
+        self.session.mount(
+            "https://",
+            HTTPAdapter(
+                pool_connections=1,  # 1 host: api.openaq.org
+                pool_maxsize=OpenAQClient.POOL_MAXSIZE,
+                max_retries=Retry(
+                    total=5,
+                    backoff_factor=1.0,
+                    status_forcelist=[429, 500, 502, 503, 504],
+                    respect_retry_after_header=True,  # 429: waits for the reset
+                    raise_on_status=False,  # last response goes to raise_for_status
+                ),
+            ),
+        )
+
+        # Compressed JSON responses (gzip/deflate, and br/zstd if brotli/zstandard are
+        # installed) so only the encodings urllib3 can decode are advertised
+        self.session.headers.update(make_headers(accept_encoding=True))
+        self.session.headers.update(
+            {
+                "X-API-Key": self.apikey,
+                "accept": "application/json",
+            }
+        )
+
+        # (connect, read) timeouts: a stalled connection fails instead of hanging a thread
+        self.timeout = (5, 30)
 
         # DATA STORAGE
         self.locations = None
@@ -79,49 +197,107 @@ class OpenAQClient:
         self.ratelimit_used = -1
         self.ratelimit_remaining = -1
         self.ratelimit_reset = -1
+        self._next_call_at = 0.0
+
+    def get_available_calls(self) -> int:
+        """Get the remaining calls of the window minus the requests still in flight."""
+        return self.ratelimit_remaining - self._in_flight
 
     def should_wait(self) -> bool:
-        """Get the current rate limit status."""
-        return self.ratelimit_remaining >= 0 and self.ratelimit_remaining < 5
+        """Get the current rate limit status (budget exhausted until the reset)."""
+        # Margin of the in-flight requests (up to POOL_MAXSIZE): they spend the same budget
+        return self.ratelimit_remaining >= 0 and self.get_available_calls() <= 0
+
+    def get_pace(self) -> float:
+        """Get the delay between calls that spreads the remaining budget over the window."""
+        if self.ratelimit_remaining < 0 or self.ratelimit_reset <= 0:
+            return 0.0  # no rate limit headers yet
+        return self.ratelimit_reset / max(self.get_available_calls(), 1)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=8)
+    def get_parse_options(schema: pa.Schema) -> pajson.ParseOptions:
+        """Get the Arrow JSON parse options of a response body with results of this schema."""
+        return pajson.ParseOptions(
+            explicit_schema=pa.schema([("results", pa.list_(pa.struct(schema)))]),
+            newlines_in_values=True,  # the body is 1 (pretty printed) JSON object
+        )
+
+    @staticmethod
+    def parse_results(content: bytes, schema: pa.Schema) -> dict[str, Any]:
+        """Parse a response body into its meta (dict) and its results (Arrow table)."""
+        body = pajson.read_json(
+            io.BytesIO(content),
+            parse_options=OpenAQClient.get_parse_options(schema),
+        )
+        results = body.column("results").combine_chunks().flatten()
+        return {
+            "meta": body.column("meta").to_pylist()[0],  # inferred (found: int or str)
+            "results": pa.Table.from_struct_array(results),
+        }
 
     def request_api(
         self, url: str, request_params: dict, **kwargs
-    ) -> dict[str, pd.DataFrame]:
-        """Make a request to the OpenAQ API and return the results as a DataFrame."""
+    ) -> dict[str, pd.DataFrame | pa.Table]:
+        """Make a request to the OpenAQ API and return the results as a DataFrame (or a flat Arrow table with a schema)."""
 
         verbose = kwargs.get("verbose", self.verbose)
-
-        request_headers = {
-            "X-API-Key": self.apikey,
-            "accept": "application/json",
-        }
+        schema = kwargs.get("schema", None)  # pa.Schema of the results
 
         # Check rate limits before making the request
-        # if self.ratelimit_remaining >= 0 and self.ratelimit_remaining < 5:
-        if self.should_wait():
-            # if verbose >= 1:
-            logger.trace(
-                f"{hex('#dfa934')}WAIT{rst()}{grey()}: {f'Waiting for reset in {self.ratelimit_reset}s':<26} ({self.ratelimit_remaining} remaining)"
-            )
-            # logger.warning(f"{grey()}Approaching rate limit. Remaining requests: {self.ratelimit_remaining}. Waiting for reset in {self.ratelimit_reset} seconds.{rst()}")
-            time.sleep(self.ratelimit_reset + 1)
+        # The lock makes concurrent downloads wait for the same reset window (safety net)
+        with self._ratelimit_lock:
+            if self.should_wait():
+                # if verbose >= 1:
+                logger.trace(
+                    f"{hex('#dfa934')}WAIT{rst()}{grey()}: {f'Waiting for reset in {self.ratelimit_reset}s':<26} ({self.ratelimit_remaining} remaining)"
+                )
+                # logger.warning(f"{grey()}Approaching rate limit. Remaining requests: {self.ratelimit_remaining}. Waiting for reset in {self.ratelimit_reset} seconds.{rst()}")
+                time.sleep(self.ratelimit_reset + 1)
 
-            self.ratelimit_used = 0
-            self.ratelimit_remaining = 60
-            self.ratelimit_reset = 60
+                self.ratelimit_used = 0
+                self.ratelimit_remaining = 60
+                self.ratelimit_reset = 60
+                self._next_call_at = 0.0
+
+            # Pacing: each call reserves the next slot, the calls are spread over the window
+            # instead of bursting through the budget then stalling until the reset
+            now = time.monotonic()
+            call_at = max(now, self._next_call_at)
+            self._next_call_at = call_at + self.get_pace()
+            self._in_flight += 1
 
         # Make the Request
         try:
-            start_time = time.perf_counter()
+            try:
+                if call_at > now:
+                    time.sleep(call_at - now)
 
-            response = requests.get(url, headers=request_headers, params=request_params)
-            response.raise_for_status()  # Raises error for 4xx or 5xx
+                start_time = time.perf_counter()
 
-            self.ratelimit_used = int(response.headers.get("X-Ratelimit-Used", 0))
-            self.ratelimit_remaining = int(
-                response.headers.get("X-Ratelimit-Remaining", 0)
-            )
-            self.ratelimit_reset = int(response.headers.get("X-Ratelimit-Reset", 0))
+                response = self.session.get(
+                    url, params=request_params, timeout=self.timeout
+                )
+            except BaseException:
+                with self._ratelimit_lock:
+                    self._in_flight -= 1
+                raise
+
+            # The response headers now count this call (no longer in flight)
+            with self._ratelimit_lock:
+                self._in_flight -= 1
+                if response.ok:
+                    self.ratelimit_used = int(
+                        response.headers.get("X-Ratelimit-Used", 0)
+                    )
+                    self.ratelimit_remaining = int(
+                        response.headers.get("X-Ratelimit-Remaining", 0)
+                    )
+                    self.ratelimit_reset = int(
+                        response.headers.get("X-Ratelimit-Reset", 0)
+                    )
+
+            response.raise_for_status()  # Raises error for 4xx or 5xx
 
             # # ---------------------------------------------------------------------
             # # Randomly simulate HTTPError for testing purposes and add a status code
@@ -137,12 +313,20 @@ class OpenAQClient:
                 )
 
             # 4. Process Data
-            data = response.json()
+            # Flatten results into a DataFrame (decoded from the raw bytes, no intermediate str)
+            if schema is None:
+                data = json.loads(response.content)
+                results = pd.json_normalize(data["results"])
 
-            data["meta"]["request_duration"] = exec_time(start_time)
+            # Or into an Arrow table with a fixed schema ("a.b.c" columns, like json_normalize)
+            # The raw body is parsed by the Arrow JSON reader (no python object per value)
+            else:
+                data = self.parse_results(response.content, schema)
+                results = data["results"]
+                while any(pa.types.is_struct(field.type) for field in results.schema):
+                    results = results.flatten()
 
-            # Flatten results into a DataFrame
-            results = pd.json_normalize(data["results"])
+            data["meta"]["request_duration"] = exec_time(start_time)
 
             # # Convert columns with "datetime" in their names to datetime types
             # datetime_columns = [col for col in results.columns if "datetime" in col]
@@ -157,14 +341,12 @@ class OpenAQClient:
             return {"meta": data["meta"], "results": results}
 
         except requests.exceptions.HTTPError as err:
-            # TODO: just test for string "429 Too Many Requests" directly in the error message (kinda broken but eh)
-            # Rate limit handling: wait for reset if 429 Too Many Requests (if spamming 400/500 errors)
-            if err.response.status_code == 429 or "429 Client Error" in str(err):
+            # Rate limit: the adapter already backed off (and honored Retry-After) on 429
+            if err.response.status_code == 429:
                 print()
                 logger.warning(
-                    f"{hex('#dfa934')}[{err.response.status_code}] RATE LIMIT{rst()}{grey()}: Hit rate limit. Waiting for 60s...{rst()}"
+                    f"{hex('#dfa934')}[{err.response.status_code}] RATE LIMIT{rst()}{grey()}: Still rate limited after the retries.{rst()}"
                 )
-                time.sleep(60)  # Wait for 60 seconds before retrying
 
             # print(f"HTTP error occurred: {err}")
             # print(response.text)  # Print the error message from OpenAQ
@@ -174,10 +356,114 @@ class OpenAQClient:
 # ============================================================================
 
 
+class MeasurementsBuffer:
+    """Coalesce the measurements of many sensors into large Parquet files in GCS (thread-safe)."""
+
+    # Flush thresholds: few large files per run instead of 1 small file per sensor
+    MAX_ROWS = 1_000_000
+    MAX_BYTES = 128 * 1024 * 1024
+
+    def __init__(self, run_id: str, **kwargs) -> None:
+        self.run_id = run_id
+        self.max_rows = kwargs.get("max_rows", MeasurementsBuffer.MAX_ROWS)
+        self.max_bytes = kwargs.get("max_bytes", MeasurementsBuffer.MAX_BYTES)
+
+        self.frames: dict[int, pd.DataFrame] = {}  # sensor_id: measurements
+        self.rows = 0
+        self.nbytes = 0
+        self._lock = threading.Lock()
+
+    def add(self, sensor_id: int, df: pd.DataFrame) -> None:
+        """Add the measurements of a sensor (flushed by the thread collecting the results)."""
+
+        with self._lock:
+            self.frames[sensor_id] = df
+            self.rows += len(df)
+            self.nbytes += int(df.memory_usage(index=False).sum())
+
+    def is_full(self) -> bool:
+        """Check if the buffered measurements reached a flush threshold."""
+        return self.rows >= self.max_rows or self.nbytes >= self.max_bytes
+
+    def take(self) -> dict[int, pd.DataFrame]:
+        """Empty the buffer and return its measurements (sensor_id: measurements)."""
+
+        # Swap the frames under the lock, the upload doesn't block the other threads
+        with self._lock:
+            frames, self.frames = self.frames, {}
+            self.rows = 0
+            self.nbytes = 0
+
+        return frames
+
+    def upload(self, frames: dict[int, pd.DataFrame]) -> list[int]:
+        """Stream measurements to GCS as 1 Parquet file, return their sensor ids."""
+
+        if len(frames) == 0:
+            return []
+
+        # Scoped by run_id so concurrent periods don't load/clear each other
+        OpenAQMeasurementsTable().save_dataframe_to_gcs(
+            pd.concat(frames.values(), ignore_index=True),
+            "staging",
+            f"openaq/measurements/{self.run_id}/{self.run_id}_{uuid.uuid4().hex[:8]}.raw.parquet",
+        )
+
+        return list(frames)
+
+    def flush(self) -> list[int]:
+        """Upload the buffered measurements to GCS, return their sensor ids."""
+        return self.upload(self.take())
+
+
+# ============================================================================
+
+
 class AreaDownloader:
     SAVE_TO_GCS = True
     SAVE_TO_DISK = False
 
+    # Periods can be downloaded concurrently (see download_periods_from_area)
+    MAX_CONCURRENT_PERIODS = 8
+    MAX_CONCURRENT_SENSORS = 4  # per period
+    MAX_CONCURRENT_PAGES = 2  # per sensor: 8 x 4 x 2 = OpenAQClient.POOL_MAXSIZE
+    MAX_CONCURRENT_UPLOADS = 2  # per period: GCS flushes of the MeasurementsBuffer
+
+    # Completed periods, to skip them when the same sweep is ran again
+    MANIFEST_PATH = config.DATA_PATH / "openaq_manifest.parquet"
+
+    # Flattened sensors of the locations (see load_bbox)
+    SENSORS_FLAT_COLUMNS = [
+        "id",
+        "location_id",
+        "name",
+        "parameter.id",
+        "parameter.name",
+        "parameter.units",
+        "parameter.displayName",
+    ]
+
+    # Locations/sensors of a bbox are cached on disk (see load_bbox)
+    BBOX_CACHE_TTL = 86400  # seconds
+
+    # Highly repeated labels of the locations/sensors (kept as pandas categories)
+    LOCATIONS_CATEGORICAL_COLUMNS = [
+        "timezone",
+        "country_id",
+        "country_code",
+        "country_name",
+        "owner_id",
+        "owner_name",
+        "provider_id",
+        "provider_name",
+    ]
+    SENSORS_CATEGORICAL_COLUMNS = [
+        "parameter_id",
+        "parameter_name",
+        "parameter_units",
+        "parameter_displayName",
+    ]
+
     def __init__(self, **kwargs) -> None:
         self.area_id = kwargs.get("area_id", "unknown_area_id")
         self.area_name = kwargs.get("area_name", "unknown_area_name")
@@ -189,6 +475,16 @@ class AreaDownloader:
     # ---------------------------------------------------------------------
     # STATIC FUNCTIONS
 
+    @staticmethod
+    def categorize_columns(df: pd.DataFrame, columns: list[str]) -> pd.DataFrame:
+        """Convert repeated string columns to categories (dictionary encoded in Parquet)."""
+
+        for col in columns:
+            if col in df.columns:
+                df[col] = df[col].astype("category")
+
+        return df
+
     @staticmethod
     def standardized_measurements_sorting(measurements: pd.DataFrame) -> None:
         """Standardize the sorting of measurements DataFrame."""
@@ -208,18 +504,36 @@ class AreaDownloader:
             inplace=True,
         )
 
+    @staticmethod
+    def standardized_measurements_table_sorting(measurements: pa.Table) -> pa.Table:
+        """Standardize the sorting of a single-sensor measurements Arrow table."""
+
+        # Same order as standardized_measurements_sorting: sensor_id is constant per table,
+        # so a stable sort on the datetime alone is enough (no pandas copy)
+        sorting_column = "period.datetimeTo.local"
+
+        if sorting_column not in measurements.column_names:
+            raise ValueError(
+                f"Measurements table must contain the following column for sorting: {sorting_column}"
+            )
+
+        return measurements.take(
+            pc.sort_indices(measurements, sort_keys=[(sorting_column, "ascending")])
+        )
+
     @staticmethod
     def print_period_logs(
-        all_period_logs: list[dict[str, Any]], show_errors: bool = False
+        all_period_logs: list[dict[str, Any] | list], show_errors: bool = False
     ) -> None:
-        # TODO: Fix errors:
-        # Traceback (most recent call last):
-        # File "/home/deniscck/code/denis-cck/openaq_anomaly_prediction/openaq_download.py", line 82, in <module>
-        #     AreaDownloader.print_period_logs(all_logs, True)
-        # File "/home/deniscck/code/denis-cck/openaq_anomaly_prediction/src/openaq_anomaly_prediction/load/openaq.py", line 187, in print_period_logs
-        #     if period["status"] == "completed":
-        #     ~~~~~~^^^^^^^^^^
-        # TypeError: list indices must be integers or slices, not str
+        """Print a summary of the logs returned by download_period(s)_from_area."""
+
+        # Consolidate the logs once: periods without sensors return an empty list
+        all_period_logs = [
+            period for period in all_period_logs if isinstance(period, dict)
+        ]
+        if len(all_period_logs) == 0:
+            logger.warning("No period logs to summarize.")
+            return
 
         for i, period in enumerate(all_period_logs):
             if i == 0:
@@ -283,9 +597,36 @@ class AreaDownloader:
     # ---------------------------------------------------------------------
     # PUBLIC METHODS
 
-    def load_bbox(self, x1: float, y1: float, x2: float, y2: float) -> None:
+    def get_bbox_cache_path(self, x1: float, y1: float, x2: float, y2: float) -> Path:
+        """Get the cache directory of the locations and sensors of a bounding box."""
+
+        bbox_key = repr((self.area_id, (x1, y1, x2, y2))).encode()
+        bbox_hash = hashlib.blake2b(bbox_key, digest_size=16).hexdigest()
+
+        return config.DATA_CACHE_PATH / f"bbox_{bbox_hash}"
+
+    def load_bbox(self, x1: float, y1: float, x2: float, y2: float, **kwargs) -> None:
         """Load locations and sensors within a bounding box defined by (x1, y1) and (x2, y2)."""
 
+        use_cache = kwargs.get("use_cache", True)
+
+        # Reuse the cached locations and sensors (already upserted in BigQuery)
+        cache_path = self.get_bbox_cache_path(x1, y1, x2, y2)
+        locations_file = cache_path / "locations.parquet"
+        sensors_file = cache_path / "sensors.parquet"
+
+        if (
+            use_cache
+            and locations_file.exists()
+            and sensors_file.exists()
+            and time.time() - locations_file.stat().st_mtime
+            < AreaDownloader.BBOX_CACHE_TTL
+        ):
+            self.locations = pd.read_parquet(locations_file)
+            self.sensors = pd.read_parquet(sensors_file)
+            logger.trace(f"Loaded locations and sensors from cache: {cache_path}")
+            return
+
         res = client.request_api(
             "https://api.openaq.org/v3/locations",
             {
@@ -304,30 +645,35 @@ class AreaDownloader:
         )
 
         # Get a full list of sensors for the area (flatten "parameters")
-        def _flatten_sensors(row):
-            flattened = [
-                {
-                    "id": sensor.get("id"),
-                    "location_id": row.get("id"),
-                    "name": sensor.get("name"),
-                    "parameter.id": sensor.get("parameter", {}).get("id"),
-                    "parameter.name": sensor.get("parameter", {}).get("name"),
-                    "parameter.units": sensor.get("parameter", {}).get("units"),
-                    "parameter.displayName": sensor.get("parameter", {}).get(
-                        "displayName"
-                    ),
-                }
-                for sensor in row.get("sensors", [])
-            ]
-            return flattened
-
-        results["sensors_flat"] = results.apply(_flatten_sensors, axis=1)
-        df_sensors_exploded = pd.DataFrame(results["sensors_flat"].explode().tolist())
+        # Unnested in Arrow: 1 row per sensor (locations without sensors are dropped), then "a.b" columns
+        sensors = pa.array(results["sensors"].tolist())  # list<struct>
+        flat_sensors = pc.list_flatten(sensors)
+        df_sensors_exploded = (
+            pa.Table.from_struct_array(flat_sensors).flatten().to_pandas()
+            if pa.types.is_struct(flat_sensors.type)
+            else pd.DataFrame()  # no sensors in the area (list<null>)
+        ).reindex(columns=AreaDownloader.SENSORS_FLAT_COLUMNS)
+        df_sensors_exploded["location_id"] = results["id"].to_numpy()[
+            pc.list_parent_indices(sensors).to_numpy()
+        ]
 
         self.sensors = OpenAQSensorsTable().save_dataframe(
             df_sensors_exploded, skip_bq=False
         )
 
+        # Repeated labels are only stored once in memory (and in the cache files)
+        self.categorize_columns(
+            self.locations, AreaDownloader.LOCATIONS_CATEGORICAL_COLUMNS
+        )
+        self.categorize_columns(
+            self.sensors, AreaDownloader.SENSORS_CATEGORICAL_COLUMNS
+        )
+
+        # Cache the cleaned locations and sensors for the next runs
+        os.makedirs(cache_path, exist_ok=True)
+        self.locations.to_parquet(locations_file, index=False, compression="zstd")
+        self.sensors.to_parquet(sensors_file, index=False, compression="zstd")
+
         # Get a full list of instruments for the area
         # df_instruments_exploded = results["instruments"].explode()
         # self.instruments = pd.DataFrame(df_instruments_exploded.tolist())
@@ -348,32 +694,33 @@ class AreaDownloader:
         filtered_locations = self.locations[
             ["id", "datetimeFirst_utc", "datetimeLast_utc"]
         ]
-        mask_filter = pd.Series(True, index=filtered_locations.index)
+        # Boolean numpy masks (no intermediate Series), the dates are parsed once
+        mask_filter = np.ones(len(filtered_locations), dtype=bool)
 
         if verbose >= 5:
             logger.trace(f"Locations found before filters: {mask_filter.sum()}")
 
         if from_date != "":
-            mask_filter = mask_filter & (
+            mask_filter &= (
                 filtered_locations["datetimeLast_utc"]
                 >= pd.to_datetime(from_date, utc=True)
-            )
+            ).to_numpy()
         if to_date != "":
-            mask_filter = mask_filter & (
+            mask_filter &= (
                 filtered_locations["datetimeFirst_utc"]
                 <= pd.to_datetime(to_date, utc=True)
-            )
+            ).to_numpy()
 
         if verbose >= 5:
             logger.trace(f"Locations found after filters: {mask_filter.sum()}")
 
-        # Join sensors with filtered locations: only add "datetimeFirst_utc" and "datetimeLast_utc" columns
-        sensors_with_dates = self.sensors[
-            self.sensors["location_id"].isin(filtered_locations[mask_filter]["id"])
-        ].join(
-            filtered_locations.set_index("id"),
-            on="location_id",
-            how="left",
+        # Inner merge of sensors with the (small) kept locations: only add "datetimeFirst_utc"
+        # and "datetimeLast_utc" columns, no isin pre-filter nor set_index on every call
+        kept_locations = filtered_locations[mask_filter].rename(
+            columns={"id": "location_id"}
+        )
+        sensors_with_dates = self.sensors.merge(
+            kept_locations, on="location_id", how="inner", sort=False
         )
 
         if verbose >= 5:
@@ -396,6 +743,8 @@ class AreaDownloader:
         prefix_msg = kwargs.get("prefix_msg", None)
         suffix_msg = kwargs.get("suffix_msg", None)
         max_sensor_length = kwargs.get("max_sensor_length", 0)
+        gcs_buffer = kwargs.get("gcs_buffer", None)  # MeasurementsBuffer of the run
+        page_updates = kwargs.get("page_updates", True)  # inline update per page
 
         suffix_msg = "" if suffix_msg is None else suffix_msg + " "  # default
         inline_sensor_str = f"[sensor_id={sensor_id}]"
@@ -412,10 +761,21 @@ class AreaDownloader:
         if verbose >= 5 and inline_progress:
             max_sensor_length += 12  # extra space for "[sensor_id=...]"
 
-            progress.print(start_message, prefix_msg=prefix_msg)
+            if page_updates:
+                progress.print(start_message, prefix_msg=prefix_msg)
 
         start_time = time.perf_counter()
 
+        # The status lines are only formatted when printed (verbose 5+), not on every page
+        sensor_msg = f"{suffix_msg}{inline_sensor_str:<{max_sensor_length}}"
+
+        def status_message(progress_update: str) -> str:
+            req_duration = exec_time(start_time)  # overall duration
+            req_message = ProgressLogger.time_gradient(
+                f"{req_duration:.2f}s", req_duration, 20.0
+            )
+            return f"{progress_update:<26} {sensor_msg} | {req_message}: -> {client.get_ratelimit_string()}"
+
         # 1.1. EXIT: Exlude banned sensors
         # Doesn't work because a sensor can be bad only for a specific period
         # if sensor_id in config.get_excluded_sensors():
@@ -432,30 +792,44 @@ class AreaDownloader:
         #         logger.success(f"Excluded sensor (sensor_id={sensor_id})")
         #     return pd.DataFrame()
 
-        # 2. Start LOOP to fetch all pages
-        page = 1
-        found_value = -1  # -1 = first time, 0 = no results, >0 = number of results
-        all_measurements = pd.DataFrame()
-        all_results = []
-        while True:
-            if client.should_wait() and verbose >= 5:
-                print()  # Move to a new line before waiting
+        page_limit = 1000
 
-            # 3. Make API Request
-            res = client.request_api(
+        def request_page(page: int) -> dict:
+            return client.request_api(
                 f"https://api.openaq.org/v3/sensors/{sensor_id}/measurements/hourly",
                 {
                     "datetime_from": datetime_from,
                     "datetime_to": datetime_to,
-                    "limit": 1000,
+                    "limit": page_limit,
                     "page": page,
                 },
+                schema=OPENAQ_MEASUREMENTS_SCHEMA,
             )
+
+        # The next pages are requested together once 'found' is known (page 1)
+        prefetched = {}  # page: Future
+        executor = ThreadPoolExecutor(max_workers=AreaDownloader.MAX_CONCURRENT_PAGES)
+
+        # 2. Start LOOP to fetch all pages
+        page = 1
+        found_value = -1  # -1 = first time, 0 = no results, >0 = number of results
+        all_measurements = pd.DataFrame()
+        all_results = []  # 1 Arrow table per page
+        results_count = 0
+        while True:
+            if client.should_wait() and verbose >= 5:
+                print()  # Move to a new line before waiting
+
+            # 3. Make API Request (or get the prefetched page)
+            try:
+                if page in prefetched:
+                    res = prefetched.pop(page).result()
+                else:
+                    res = request_page(page)
+            except BaseException:
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
             # req_duration = res["meta"]["request_duration"]
-            req_duration = exec_time(start_time)  # overall duration
-            req_message = ProgressLogger.time_gradient(
-                f"{req_duration:.2f}s", req_duration, 20.0
-            )
 
             # Process 'found' value the first request only
             if found_value == -1:
@@ -464,13 +838,20 @@ class AreaDownloader:
                 if isinstance(found_value, pd.Series):
                     found_value = found_value.iloc[0]
 
+                # Prefetch the remaining pages (pipelined instead of 1 round trip each)
+                if isinstance(found_value, int) and found_value > page_limit:
+                    last_page = -(-found_value // page_limit)  # ceil
+                    prefetched = {
+                        next_page: executor.submit(request_page, next_page)
+                        for next_page in range(page + 1, last_page + 1)
+                    }
+
                 # 3.1 EXIT: if found == 0 for the first request, exit
                 if found_value == 0 and page == 1:
                     # 6.1 EXIT: No measurements found
                     if verbose >= 5:
-                        progress_update = ""
                         progress.print(
-                            f"----  {'none':<26} {suffix_msg}{inline_sensor_str:<{max_sensor_length}} | {req_message}: -> {client.get_ratelimit_string()}",
+                            f"----  {status_message('none')}",
                             prefix_msg=prefix_msg,
                             suffix_msg=suffix_msg,
                             last=True,
@@ -484,51 +865,40 @@ class AreaDownloader:
             # 4. Save results (append to all_measurements)
             # res["results"]["ingested_at"] = get_iso_now()  # add [ingested_at] DONE IN MEASUREMENTS SCHEMA
 
-            reordered_columns = ["sensor_id"] + res["results"].columns.tolist()
-            res["results"]["sensor_id"] = sensor_id  # add [sensor_id]
-
-            results = res["results"][reordered_columns]
+            results = res["results"]  # [sensor_id] is added once, after the concat
 
             # Not great but whatever
-            if len(results) == 0:
+            if results.num_rows == 0:
                 logger.trace(
                     f"No results for sensor_id={sensor_id} in the given period (triggered warning on page {page})."
                 )
             else:
-                all_results.extend(results.to_dict(orient="records"))
+                all_results.append(results)
+                results_count += results.num_rows
 
             # FutureWarning: The behavior of DataFrame concatenation with empty or all-NA entries is deprecated.
             # In a future version, this will no longer exclude empty or all-NA columns when determining the result dtypes.
             # To retain the old behavior, exclude the relevant entries before the concat operation.
             # all_measurements = pd.concat([all_measurements, results])
 
-            if verbose >= 5:
-                progress_update = f"{len(all_results)}/{found_value} measurements"
-                if len(all_results) == found_value:  # last step
-                    message = f"{progress_update:<26} {suffix_msg}{inline_sensor_str:<{max_sensor_length}} | {req_message}: -> {client.get_ratelimit_string()}"
-                    last = True
-                    # DISABLE FOR GCS STREAMING
-                    last = False
-                else:
-                    message = f"{progress_update:<26} {suffix_msg}{inline_sensor_str:<{max_sensor_length}} | {req_message}: -> {client.get_ratelimit_string()}"
-                    last = False
-
+            # The last page line is completed after the save (GCS streaming, see below)
+            if verbose >= 5 and page_updates:
                 progress.print(
-                    message,
-                    current_progress=len(all_results),
+                    status_message(f"{results_count}/{found_value} measurements"),
+                    current_progress=results_count,
                     total_progress=found_value,
                     prefix_msg=prefix_msg,
-                    last=last,
+                    last=False,
                 )
 
             # 5. EXIT: All measurements retrieved
-            if len(all_results) >= found_value:
+            if results_count >= found_value:
                 if verbose >= 1 and not inline_progress:
                     # if verbose >= 5:
                     #     print()
                     # if not inline_progress:
                     measurements_msg = (
-                        "0" if found_value == 0 else f"{len(all_results)}/{found_value}"
+                        "0" if found_value == 0 else f"{results_count}/{found_value}"
                     )
                     logger.success(
                         f"Retrieved {measurements_msg} measurements in {exec_time(start_time, fmt=True)} (sensor_id={sensor_id})"
@@ -537,21 +907,42 @@ class AreaDownloader:
 
             page += 1
 
-        if len(all_results) > 0:
-            all_measurements = pd.DataFrame(all_results)
-            AreaDownloader.standardized_measurements_sorting(all_measurements)
+        # Nothing left to wait for (prefetched pages past the last one are dropped)
+        executor.shutdown(wait=False, cancel_futures=True)
+
+        if results_count > 0:
+            all_results = AreaDownloader.standardized_measurements_table_sorting(
+                pa.concat_tables(all_results)
+            )
+            # Add [sensor_id], then 1 pandas block per column (no consolidation copy)
+            all_measurements = all_results.add_column(
+                0,
+                "sensor_id",
+                pa.array(np.full(all_results.num_rows, sensor_id, dtype=np.int64)),
+            ).to_pandas(split_blocks=True)
 
             parquet_filename = f"{run_id}_sensor_{sensor_id}.raw.parquet"
-            final_message = message
+            final_message = (
+                status_message(f"{results_count}/{found_value} measurements")
+                if verbose >= 5
+                else ""
+            )
+
+            # Coalesce with the other sensors of the run (flushed in large files)
+            if AreaDownloader.SAVE_TO_GCS and gcs_buffer is not None:
+                gcs_buffer.add(sensor_id, all_measurements)
+
+                final_message += " | buffered for GCS"
 
             # Stream dataframe to GCS (staging bucket)
-            if AreaDownloader.SAVE_TO_GCS:
+            elif AreaDownloader.SAVE_TO_GCS:
                 gcs_time = time.perf_counter()
 
+                # Scoped by run_id so concurrent periods don't load/clear each other
                 OpenAQMeasurementsTable().save_dataframe_to_gcs(
                     all_measurements,
                     "staging",
-                    f"openaq/measurements/{parquet_filename}",
+                    f"openaq/measurements/{run_id}/{parquet_filename}",
                 )
                 # gcs.stream_dataframe_to_gcs(
                 #     all_measurements, "staging", f"openaq/{parquet_filename}"
@@ -568,18 +959,21 @@ class AreaDownloader:
                 all_measurements.to_parquet(
                     parquet_file,
                     index=False,
-                    compression="snappy",
+                    **get_parquet_write_options(
+                        pa.Schema.from_pandas(all_measurements, preserve_index=False)
+                    ),
                 )
 
                 final_message += " | saved to disk"
 
-            progress.print(
-                final_message,
-                current_progress=1,
-                total_progress=1,
-                prefix_msg=prefix_msg,
-                last=True,
-            )
+            if verbose >= 5:
+                progress.print(
+                    final_message,
+                    current_progress=1,
+                    total_progress=1,
+                    prefix_msg=prefix_msg,
+                    last=True,
+                )
 
         return all_measurements
 
@@ -596,6 +990,7 @@ class AreaDownloader:
         verbose = kwargs.get("verbose", self.verbose)
         prefix_msg = kwargs.get("prefix_msg", None)
         suffix_msg = kwargs.get("suffix_msg", None)
+        max_workers = kwargs.get("max_workers", AreaDownloader.MAX_CONCURRENT_SENSORS)
 
         total = len(sensors_id)
 
@@ -620,27 +1015,56 @@ class AreaDownloader:
         errors = []
         total = len(sensors_id)
         max_sensor_length = len(str(max(sensors_id)))
-        for i, sensor_id in enumerate(sensors_id):
-            try:
-                max_progress_length = len(str(total))
-                progress_msg = f"{i + 1:>{max_progress_length}}/{total}"
-                # 1. Fetch measurements for the sensor
-                df_measurements = self.fetch_sensor_measurements(
-                    sensor_id,
-                    datetime_from=datetime_from,
-                    datetime_to=datetime_to,
-                    run_id=run_id,
-                    prefix_msg=progress_msg if prefix_msg is None else prefix_msg,
-                    suffix_msg="" if suffix_msg is None else suffix_msg,
-                    # suffix_msg=progress_msg if suffix_msg is None else suffix_msg,
-                    # suffix_msg=f"{progress_msg:>{len(str(total)) * 2 + 1}}"
-                    # if suffix_msg is None
-                    # else suffix_msg,
-                    max_sensor_length=max_sensor_length,  # for alignement
-                    inline_progress=True,
-                    verbose=5,
+        max_progress_length = len(str(total))
+
+        # The sensors are saved to GCS together (few large files, see MeasurementsBuffer)
+        gcs_buffer = MeasurementsBuffer(run_id)
+
+        # 1. Fetch measurements for the sensor (the pages of a sensor are sequential)
+        def fetch(i: int, sensor_id: int) -> pd.DataFrame:
+            progress_msg = f"{i + 1:>{max_progress_length}}/{total}"
+            return self.fetch_sensor_measurements(
+                sensor_id,
+                datetime_from=datetime_from,
+                datetime_to=datetime_to,
+                run_id=run_id,
+                prefix_msg=progress_msg if prefix_msg is None else prefix_msg,
+                suffix_msg="" if suffix_msg is None else suffix_msg,
+                max_sensor_length=max_sensor_length,  # for alignement
+                inline_progress=True,
+                page_updates=max_workers == 1,  # concurrent: 1 final line per sensor
+                gcs_buffer=gcs_buffer,
+                verbose=5,
+            )
+
+        # The sensors are fetched concurrently (shared session and rate limit pacing)
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        futures = [
+            executor.submit(fetch, i, sensor_id)
+            for i, sensor_id in enumerate(sensors_id)
+        ]
+
+        # Full buffers are uploaded in the background, the sensors keep being collected
+        upload_executor = ThreadPoolExecutor(
+            max_workers=AreaDownloader.MAX_CONCURRENT_UPLOADS
+        )
+        uploads: list[tuple[list[int], Future]] = []  # (sensor ids, upload)
+
+        def flush_gcs_buffer() -> None:
+            frames = gcs_buffer.take()
+            if len(frames) > 0:
+                uploads.append(
+                    (list(frames), upload_executor.submit(gcs_buffer.upload, frames))
                 )
 
+        # Results in the same order as the sensors
+        for sensor_id, future in zip(sensors_id, futures):
+            if AreaDownloader.SAVE_TO_GCS and gcs_buffer.is_full():
+                flush_gcs_buffer()
+
+            try:
+                df_measurements = future.result()
+
                 if len(df_measurements) > 0:
                     parquet_filename = f"{run_id}_sensor_{sensor_id}.raw.parquet"
                     saved.append(parquet_filename)
@@ -672,6 +1096,42 @@ class AreaDownloader:
                         "error": e,
                     }
                 )
+
+            except KeyboardInterrupt:
+                # Don't start the queued sensors, running ones finish their current call
+                executor.shutdown(wait=False, cancel_futures=True)
+                upload_executor.shutdown(wait=False, cancel_futures=True)
+                raise
+
+        executor.shutdown()
+
+        # Remaining buffered measurements, then wait for all the uploads (before the run is loaded from GCS)
+        if AreaDownloader.SAVE_TO_GCS:
+            flush_gcs_buffer()
+        upload_executor.shutdown()
+
+        # A failed upload: its sensors are downloaded again (no duplicates in GCS)
+        failed_uploads: set[str] = set()
+        for upload_sensor_ids, upload in uploads:
+            try:
+                upload.result()
+            except Exception as e:
+                print()
+                logger.error(f"[GCS] {e}")
+                for sensor_id in upload_sensor_ids:
+                    failed_uploads.add(f"{run_id}_sensor_{sensor_id}.raw.parquet")
+                    errors.append(
+                        {
+                            "run_id": run_id,
+                            "sensor_id": int(sensor_id),
+                            "datetime_from": datetime_from,
+                            "datetime_to": datetime_to,
+                            "type": "GCSError",
+                            "error": e,
+                        }
+                    )
+        saved = [filename for filename in saved if filename not in failed_uploads]
+
         if verbose >= 4:
             logger.debug(
                 f"[OPENAQ] Downloaded data for {total - len(errors)}/{total} sensors in {exec_time(start_time, fmt=True)}"
@@ -685,6 +1145,17 @@ class AreaDownloader:
 
         return {"total": total, "saved": saved, "errors": errors}
 
+    @staticmethod
+    def is_retryable_error(error: dict) -> bool:
+        """Check if a download error (download_sensors_data) can succeed on a retry."""
+
+        # Client errors won't change on a retry (except timeouts and rate limits)
+        error_type = error["type"]
+        if error_type.startswith("HTTPError4"):
+            return error_type in ("HTTPError408", "HTTPError429")
+
+        return True
+
     def download_data_with_retries(
         self,
         sensors_id: list[int],
@@ -694,136 +1165,127 @@ class AreaDownloader:
         **kwargs,
     ) -> list:
         """
-        Recursively downloads data for all sensors in the area between datetime_from and datetime_to until no errors remain.
+        Downloads data for all sensors in the area between datetime_from and datetime_to, retrying the failed sensors until no errors remain.
 
-        If ran again with the same run_id, it will overwrite existing files and refresh the trimester CSV.
+        If ran again with the same run_id, it will overwrite existing files and refresh the trimester Parquet file.
 
         Returns a dictionary with the download logs including the saved parquet files and the errors.
         """
 
-        verbose = kwargs.get("verbose", 5)
-
-        retries = kwargs.get("retries", 0)
         max_retries = kwargs.get("max_retries", 5)
 
         prefix_msg = kwargs.get("prefix_msg", None)
         suffix_msg = kwargs.get("suffix_msg", None)
 
-        # Overwrite the prefix message to indicate retries
-        prefix_msg = f"({retries})" if retries > 0 else prefix_msg
-
         start_time = time.perf_counter()
         start_logs_datetime = get_iso_now()
 
-        # --------------------------------------------------------------------------------------------
-        # 1. DOWNLOAD the measurements for each sensor
-
         logs = []
-        run_logs = self.download_sensors_data(
-            sensors_id,
-            datetime_from=datetime_from,
-            datetime_to=datetime_to,
-            run_id=run_id,
-            verbose=5,
-            prefix_msg=prefix_msg,
-            suffix_msg=suffix_msg,
-        )
-        logs.append(
-            {
-                "run_id": run_id,
-                "status": "downloaded",
-                # "datetime": start_logs_datetime,
-                "run_start": start_logs_datetime,
-                "run_end": get_iso_now(),
-                "download_duration": exec_time(start_time, 2),
-                "saved": run_logs["saved"],
-                "errors": run_logs["errors"],
-                "retries": retries,
-            }
-        )
+        pending_sensors = list(sensors_id)
+        permanent_errors = 0
+        retries = 0
+        while True:
+            round_start_time = time.perf_counter()
+            round_start_datetime = get_iso_now()
+
+            # --------------------------------------------------------------------------------------------
+            # 1. DOWNLOAD the measurements for each pending sensor
+
+            run_logs = self.download_sensors_data(
+                pending_sensors,
+                datetime_from=datetime_from,
+                datetime_to=datetime_to,
+                run_id=run_id,
+                verbose=5,
+                # Overwrite the prefix message to indicate retries
+                prefix_msg=f"({retries})" if retries > 0 else prefix_msg,
+                suffix_msg=suffix_msg,
+            )
+            logs.append(
+                {
+                    "run_id": run_id,
+                    "status": "downloaded",
+                    "run_start": round_start_datetime,
+                    "run_end": get_iso_now(),
+                    "download_duration": exec_time(round_start_time, 2),
+                    "saved": run_logs["saved"],
+                    "errors": run_logs["errors"],
+                    "retries": retries,
+                }
+            )
 
-        # --------------------------------------------------------------------------------------------
-        # 2. CHECK for errors and retry if needed
+            # --------------------------------------------------------------------------------------------
+            # 2. CHECK for errors and retry the transient ones if needed
+
+            errors = run_logs["errors"]
+            if len(errors) == 0:
+                break
+
+            retryable_errors = [
+                error for error in errors if AreaDownloader.is_retryable_error(error)
+            ]
+            if len(retryable_errors) < len(errors):
+                permanent_errors += len(errors) - len(retryable_errors)
+                logger.error(
+                    f"[SKIP] {len(errors) - len(retryable_errors)} sensor(s) with permanent errors for RUN_ID [{run_id}]"
+                )
+
+            # Only permanent errors left: the period is done (they are kept in the logs)
+            if len(retryable_errors) == 0:
+                break
 
-        retry_logs: list = []
-        if len(run_logs["errors"]) > 0:
             # Abort if there are still errors after max retries
             if retries >= max_retries:
-                logs[-1]["status"] = "aborted"  # Update the last log status to aborted
+                logs[-1]["status"] = "aborted"
                 logger.error(
                     f"[ABORT] Maximum retries reached ({max_retries}) for RUN_ID [{run_id}]"
                 )
-                # Break recursion, climb back to the first call
+                break
 
-            # Retry downloading the sensors that had errors (recursion)
-            else:
-                logs[-1]["status"] = "retrying"  # Update the last log status to aborted
+            logs[-1]["status"] = "retrying"
+            logger.warning(
+                f"[RETRY={retries + 1}] RUN_ID [{run_id}] with {len(retryable_errors)} error{'s' if len(retryable_errors) != 1 else ''}..."
+            )
 
-                logger.warning(
-                    f"[RETRY={retries + 1}] RUN_ID [{run_id}] with {len(run_logs['errors'])} error{'s' if len(run_logs['errors']) != 1 else ''}..."
-                )
-                # print()
-
-                sensors_to_retry = []
-                for error in run_logs["errors"]:
-                    sensors_to_retry.append(error["sensor_id"])
-
-                retry_logs = self.download_data_with_retries(
-                    sensors_id=sensors_to_retry,
-                    datetime_from=datetime_from,
-                    datetime_to=datetime_to,
-                    run_id=run_id,
-                    verbose=verbose,
-                    prefix_msg=prefix_msg,
-                    suffix_msg=suffix_msg,
-                    retries=retries + 1,
-                    max_retries=max_retries,
-                )
+            # Back off before the next round (jitter: concurrent periods don't retry in sync)
+            retries += 1
+            time.sleep(min(2**retries, 60) + random.uniform(0, 1))
 
-        concatenated_logs: list = logs + retry_logs if len(retry_logs) > 0 else logs
+            pending_sensors = [error["sensor_id"] for error in retryable_errors]
 
         # --------------------------------------------------------------------------------------------
-        # 3. EXIT: Last loop
-
-        if retries == 0:
-            total_errors = 0
-            total_saved = 0
-            total_retries = 0
-            for run in concatenated_logs:
-                total_errors += len(run["errors"])
-                total_saved += len(run["saved"])
-                if run["status"] == "retrying":
-                    total_retries += 1
-
-            # logger.info(f"[DOWNLOADED] Completed all downloads in {exec_time(start_time, fmt=True)}")
-            # print()
-
-            run_status = (
-                "downloaded"
-                if concatenated_logs[-1]["status"] != "aborted"
-                else "aborted"
-            )
-            return [
-                {
-                    "run_id": run_id,
-                    "status": run_status,
-                    "run_start": start_logs_datetime,
-                    "run_end": get_iso_now(),  # will be refreshed after saving
-                    "datetime_from": datetime_from,
-                    "datetime_to": datetime_to,
-                    "download_duration": exec_time(start_time, 2),
-                    "saving_duration": 0,  # to be filled later
-                    "total_duration": 0,  # to be filled later
-                    "errors": total_errors,
-                    "saved": total_saved,
-                    # "retries": len(concatenated_logs) - 1,
-                    "retries": total_retries,
-                    "sensors": sensors_id,
-                    "logs": concatenated_logs,
-                }
-            ]
-
-        return concatenated_logs
+        # 3. EXIT: summary of all the rounds
+
+        total_errors = 0
+        total_saved = 0
+        total_retries = 0
+        for run in logs:
+            total_errors += len(run["errors"])
+            total_saved += len(run["saved"])
+            if run["status"] == "retrying":
+                total_retries += 1
+
+        # Only the transient errors left after max_retries abort the period (downloaded again next time)
+        run_status = "aborted" if logs[-1]["status"] == "aborted" else "downloaded"
+        return [
+            {
+                "run_id": run_id,
+                "status": run_status,
+                "run_start": start_logs_datetime,
+                "run_end": get_iso_now(),  # will be refreshed after saving
+                "datetime_from": datetime_from,
+                "datetime_to": datetime_to,
+                "download_duration": exec_time(start_time, 2),
+                "saving_duration": 0,  # to be filled later
+                "total_duration": 0,  # to be filled later
+                "errors": total_errors,
+                "permanent_errors": permanent_errors,  # sensors skipped (4xx)
+                "saved": total_saved,
+                "retries": total_retries,
+                "sensors": sensors_id,
+                "logs": logs,
+            }
+        ]
 
     def download_period_from_area(
         self, datetime_from: str, datetime_to: str, **kwargs
@@ -881,6 +1343,10 @@ class AreaDownloader:
             datetime_to_str = dt.fromisoformat(datetime_to).strftime("%Y-%m-%d")
             run_id = f"{run_id_prefix}_{datetime_from_str}_{datetime_to_str}"
 
+        # Leftovers of an interrupted run (the buffered files are not named per sensor)
+        if AreaDownloader.SAVE_TO_GCS:
+            gcs.clear_staging_bucket(prefix=f"openaq/measurements/{run_id}/")
+
         # DOWNLOAD PERIOD: Download all measurements for the sensors in the area for the given period
         period_logs = self.download_data_with_retries(
             sensors_id,
@@ -911,7 +1377,8 @@ class AreaDownloader:
             )
 
             # Trigger the load to Big Query from GCS Parquet files
-            OpenAQMeasurementsTable().save_from_staging_bucket()
+            # Concurrent periods: own GCS prefix (run_id) and own staging table (uuid suffix)
+            OpenAQMeasurementsTable().save_from_staging_bucket(run_id=run_id)
 
             period_logs["gcs_saving_duration"] = exec_time(save_start_time, 2)
             logger.debug(
@@ -932,13 +1399,14 @@ class AreaDownloader:
                 f"Found {len(parquet_files)} parquet files in data/parquet/{run_id}/*.raw.parquet"
             )
 
-            # Save the period CSV file
-            # TODO: should switch to parquet files with DuckDB but now we'll be using GCS for 99.9% of the time so whatever
-            parquets_to_csv(parquet_files, f"{run_id}.raw.csv", config.DATA_CSV_PATH)
+            # Save the period Parquet file (data/parquet/{run_id}.raw.parquet)
+            concat_pq_to_pq(
+                parquet_files, f"{run_id}.raw.parquet", config.DATA_PARQUET_PATH
+            )
 
             period_logs["disk_saving_duration"] = exec_time(save_start_time, 2)
             logger.debug(
-                f"[DISK] Created data/csv/{run_id}.raw.csv from {len(parquet_files)} parquet files in {exec_time(save_start_time, fmt=True)}"
+                f"[DISK] Created data/parquet/{run_id}.raw.parquet from {len(parquet_files)} parquet files in {exec_time(save_start_time, fmt=True)}"
             )
 
         # --------------------------------------------------------------------------------------------
@@ -951,7 +1419,9 @@ class AreaDownloader:
             # print()
         else:
             period_logs["status"] = "completed"
-            success_msg = f"[FINISHED] Retrieved all measurements for [{self.area_id.upper()}][{run_label}] in {exec_time(start_time, fmt=True)}"
+            skipped = period_logs.get("permanent_errors", 0)
+            skipped_msg = f" ({skipped} sensors skipped)" if skipped > 0 else ""
+            success_msg = f"[FINISHED] Retrieved all measurements for [{self.area_id.upper()}][{run_label}]{skipped_msg} in {exec_time(start_time, fmt=True)}"
             logger.success(success_msg)
 
         print()
@@ -968,6 +1438,121 @@ class AreaDownloader:
 
         return period_logs
 
+    def is_period_downloaded(self, manifest: pd.DataFrame, period: dict) -> bool:
+        """Check if a period (download_period_from_area kwargs) is completed in the manifest."""
+
+        if manifest.empty:
+            return False
+
+        completed = manifest[
+            (manifest["area_id"] == self.area_id)
+            & (manifest["run_id_prefix"] == period.get("run_id_prefix", ""))
+            & (manifest["datetime_from"] == period["datetime_from"])
+            & (manifest["datetime_to"] == period["datetime_to"])
+            & (manifest["status"] == "completed")
+        ]
+
+        return not completed.empty
+
+    def update_manifest(
+        self, manifest: pd.DataFrame, period: dict, period_logs: list | dict
+    ) -> pd.DataFrame:
+        """Record a downloaded period in the manifest (and save it on disk)."""
+
+        # No sensors for the period means there is nothing to download either
+        status = period_logs["status"] if period_logs else "completed"
+
+        # Periods still in progress (current trimester) must be downloaded again
+        if status == "completed" and dt.fromisoformat(
+            period["datetime_to"]
+        ) > dt.fromisoformat(get_iso_now()):
+            status = "ongoing"
+
+        row = {
+            "area_id": self.area_id,
+            "run_id_prefix": period.get("run_id_prefix", ""),
+            "run_id": period_logs["run_id"] if period_logs else "",
+            "datetime_from": period["datetime_from"],
+            "datetime_to": period["datetime_to"],
+            "status": status,
+            "saved": period_logs["saved"] if period_logs else 0,
+            "errors": period_logs["errors"] if period_logs else 0,
+            "updated_at": get_iso_now(),
+        }
+
+        manifest = pd.concat([manifest, pd.DataFrame([row])], ignore_index=True)
+        manifest = manifest.drop_duplicates(
+            subset=["area_id", "run_id_prefix", "datetime_from", "datetime_to"],
+            keep="last",
+            ignore_index=True,
+        )
+        write_manifest(manifest, AreaDownloader.MANIFEST_PATH)
+
+        return manifest
+
+    def download_periods_from_area(self, periods: list[dict], **kwargs) -> list:
+        """Download several periods on a bounded thread pool (periods = download_period_from_area kwargs)."""
+
+        max_workers = kwargs.get("max_workers", AreaDownloader.MAX_CONCURRENT_PERIODS)
+        skip_downloaded = kwargs.get("skip_downloaded", False)
+
+        start_time = time.perf_counter()
+
+        # Skip the periods that were already downloaded (manifest on disk)
+        if skip_downloaded:
+            manifest = read_manifest(AreaDownloader.MANIFEST_PATH)
+            pending_periods = [
+                period
+                for period in periods
+                if not self.is_period_downloaded(manifest, period)
+            ]
+            if len(pending_periods) < len(periods):
+                logger.trace(
+                    f"Skipping {len(periods) - len(pending_periods)}/{len(periods)} periods already downloaded"
+                )
+            periods = pending_periods
+
+        all_logs: list = [None] * len(periods)
+
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            futures = {
+                executor.submit(self.download_period_from_area, **period): i
+                for i, period in enumerate(periods)
+            }
+            for future in as_completed(futures):
+                period = periods[futures[future]]
+                try:
+                    # Keep the logs in the same order as the periods
+                    all_logs[futures[future]] = future.result()
+                    period_logs = all_logs[futures[future]]
+
+                except Exception as e:
+                    # The other periods go on, this one is downloaded again next time
+                    logger.error(
+                        f"[OPENAQ] Period from {period['datetime_from']} to {period['datetime_to']} failed: {type(e).__name__}: {e}"
+                    )
+                    period_logs = {
+                        "status": "failed",
+                        "run_id": "",
+                        "saved": 0,
+                        "errors": 1,
+                    }
+
+                if skip_downloaded:
+                    manifest = self.update_manifest(manifest, period, period_logs)
+
+        finally:
+            # Don't start the queued periods (interrupted or manifest error),
+            # running ones finish their current call
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        logger.debug(
+            f"[OPENAQ] Downloaded {len(periods)} periods in {exec_time(start_time, fmt=True)}"
+        )
+
+        return all_logs
+
     def get_clean_measurements(self, df: pd.DataFrame) -> pd.DataFrame:
         # ---------------------------------------------------------------------
         # CLEAN MEASUREMENTS DATAFRAME
@@ -1,24 +1,18 @@
+import asyncio
+import hashlib
+import json
 import os
-import pickle
-import random
+import threading
 import time
-from datetime import date
-from datetime import datetime as dt
-from pathlib import Path
-from pprint import pprint
-from typing import Any, Union
+from typing import Any
 
 import numpy as np
 import pandas as pd
+import pyarrow as pa
 import pyarrow.parquet as pq
 import requests
-
-# pandas typing aliases from their codebase (for date types hints)
-from pandas._typing import (
-    AnyArrayLike,
-    # ArrayLike,
-    # DateTimeErrorChoices,
-)
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry, make_headers
 
 from openaq_anomaly_prediction.config import Configuration as config  # noqa: F401
 from openaq_anomaly_prediction.load.schemas.openmeteo_historical import (
@@ -26,14 +20,9 @@ from openaq_anomaly_prediction.load.schemas.openmeteo_historical import (
 )
 from openaq_anomaly_prediction.utils.helpers import (
     exec_time,
-    get_iso_now,
-    get_parquet_filepaths,
-    parquets_to_csv,
-    save_logs,
+    get_parquet_write_options,
 )
 from openaq_anomaly_prediction.utils.logger import (
-    ProgressLogger,
-    b,
     grey,
     hex,
     logger,
@@ -41,12 +30,80 @@ from openaq_anomaly_prediction.utils.logger import (
 )
 
 
+class TokenBucket:
+    """Token bucket rate limiter (refilled continuously, blocks only when empty)."""
+
+    def __init__(self, capacity: float, refill_per_sec: float) -> None:
+        self.capacity = capacity
+        self.refill_per_sec = refill_per_sec
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()  # corrected from the request threads
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated_at) * self.refill_per_sec
+        )
+        self.updated_at = now
+
+    def try_acquire(self, n: float) -> float:
+        """Take n tokens if available, else return the seconds to wait for them."""
+        with self._lock:
+            self._refill()
+            if self.tokens >= n:
+                self.tokens -= n
+                return 0.0
+            return (n - self.tokens) / self.refill_per_sec
+
+    async def acquire(self, n: float) -> None:
+        """Wait until n tokens are available and take them."""
+        if n > self.capacity:
+            raise ValueError(
+                f"Cannot acquire {n} tokens (bucket capacity: {self.capacity})."
+            )
+        while (wait := self.try_acquire(n)) > 0:
+            await asyncio.sleep(wait)
+
+    def set_remaining(self, remaining: float) -> None:
+        """Correct the bucket with the remaining calls reported by the API."""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.tokens, remaining)
+
+    def drain(self, seconds: float) -> None:
+        """Empty the bucket so the next tokens are only available in N seconds."""
+        with self._lock:
+            self._refill()
+            self.tokens = -seconds * self.refill_per_sec
+
+
 class OpenMeteoClient:
     """Open-Meteo API client wrapper."""
 
     SAVE_TO_GCS = True
     SAVE_TO_DISK = True
 
+    # Open-Meteo free tier = 600 calls per minute, 5000 calls per hour, 10000 calls per day
+    # With ALL 29 parameters, each location eats around 20 api calls per trimester
+    RATELIMIT_CALLS_PER_MINUTE = 600
+    ESTIMATED_CALLS_PER_REQUEST = 20
+    RATELIMIT_HEADROOM = 0.8  # share of the minute budget a single request can use
+
+    # The archive returns the last days with null values (archive delay): hours with a
+    # value in this column are the ones really downloaded (see is_weather_cached)
+    COMPLETENESS_COLUMN = "temperature_2m"
+
+    # Locations downloaded concurrently (see download_locations_weather_data_async)
+    MAX_CONCURRENT_LOCATIONS = 8
+    # Multi-location requests: a full batch must fit in the minute budget (24 locations)
+    LOCATIONS_PER_REQUEST = (
+        int(RATELIMIT_CALLS_PER_MINUTE * RATELIMIT_HEADROOM)
+        // ESTIMATED_CALLS_PER_REQUEST
+    )
+    MAX_RATELIMIT_RETRIES = 3
+    RATELIMIT_BACKOFF = 30  # seconds, doubled on every retry
+
     FULL_PARAMETERS = [
         "temperature_2m",
         "relative_humidity_2m",
@@ -83,20 +140,46 @@ class OpenMeteoClient:
         # KEYWORDS ARGUMENTS
         self.verbose = kwargs.get("verbose", 0)
 
+        # RATE LIMIT TRACKING (shared by all the concurrent location downloads)
+        self.ratelimit = TokenBucket(
+            capacity=OpenMeteoClient.RATELIMIT_CALLS_PER_MINUTE,
+            refill_per_sec=OpenMeteoClient.RATELIMIT_CALLS_PER_MINUTE / 60,
+        )
+
+        # HTTP SESSION: keep-alive connections reused by the concurrent location downloads
+        # (429s are NOT retried here, see request_with_backoff_async)
+        self.session = requests.Session()
+        self.session.mount(
+            "https://",
+            HTTPAdapter(
+                pool_connections=OpenMeteoClient.MAX_CONCURRENT_LOCATIONS,
+                pool_maxsize=OpenMeteoClient.MAX_CONCURRENT_LOCATIONS,
+                max_retries=Retry(
+                    total=3,
+                    backoff_factor=0.5,
+                    status_forcelist=[500, 502, 503, 504],
+                    raise_on_status=False,  # last response goes to raise_for_status
+                ),
+            ),
+        )
+        self.session.headers.update(make_headers(accept_encoding=True))
+
     def request_api(self, url: str, request_params: dict, **kwargs) -> dict:
         """Make a request to the Open-Meteo API and return the results as a DataFrame."""
         verbose = kwargs.get("verbose", self.verbose)
 
-        request_headers = {}
-
         # Make the Request
         try:
             start_time = time.perf_counter()
 
-            response = requests.get(url, headers=request_headers, params=request_params)
+            response = self.session.get(url, params=request_params)
             response.raise_for_status()  # Raises error for 4xx or 5xx
 
             # print(response.headers)
+            if "X-RateLimit-Remaining" in response.headers:
+                self.ratelimit.set_remaining(
+                    float(response.headers["X-RateLimit-Remaining"])
+                )
 
             # # ---------------------------------------------------------------------
             # # Randomly simulate HTTPError for testing purposes and add a status code
@@ -136,15 +219,25 @@ class OpenMeteoClient:
         # If daily data is needed
         # df_weather_daily = pd.DataFrame(data["daily"])
 
-        df_weather = pd.DataFrame(data["hourly"])
-        df_weather = df_weather.rename(columns={"time": "datetimeto_local"})
-        df_weather_columns = df_weather.columns.tolist()[1:]  # exclude time column
+        # Columnar response: build the columns straight from numpy arrays
+        hourly = data["hourly"]
+        df_weather_columns = [column for column in hourly if column != "time"]
+
+        # Times are UTC epochs (timeformat=unixtime), local times are derived from them
+        # (no string parsing, and no ambiguous/nonexistent local times around DST changes)
+        datetimeto_utc = pd.to_datetime(
+            np.asarray(hourly["time"], dtype=np.int64), unit="s", utc=True
+        )
 
-        df_weather["datetimeto_local"] = pd.to_datetime(
-            df_weather["datetimeto_local"]
-        ).dt.tz_localize(str(data["timezone"]))
-        df_weather["datetimeto_utc"] = df_weather["datetimeto_local"].dt.tz_convert(
-            "UTC"
+        df_weather = pd.DataFrame(
+            {
+                "datetimeto_local": datetimeto_utc.tz_convert(str(data["timezone"])),
+                "datetimeto_utc": datetimeto_utc,
+            }
+            | {
+                column: np.asarray(hourly[column], dtype=np.float64)
+                for column in df_weather_columns
+            }
         )
         df_weather["location_id"] = location_id
 
@@ -161,23 +254,71 @@ class OpenMeteoClient:
 
         return df_weather
 
+    @staticmethod
+    def get_parameters_hash(parameters: list[str] | None = None) -> str:
+        """Short deterministic hash of the hourly parameters (run ids of cached files)."""
+
+        parameters = (
+            OpenMeteoClient.FULL_PARAMETERS if parameters is None else parameters
+        )
+        return hashlib.blake2b(
+            json.dumps(sorted(parameters)).encode(), digest_size=6
+        ).hexdigest()
+
+    def get_weather_parquet_path(self, run_id: str, location_id: int) -> str:
+        """Get the Parquet file path of the weather data for the given run and location."""
+        return os.path.join(
+            config.DATA_PARQUET_PATH,
+            run_id,
+            "openmeteo",
+            f"{run_id}_location_{location_id}_weather.raw.parquet",
+        )
+
+    def is_weather_cached(
+        self, run_id: str, location_id: int, start_date: str, end_date: str
+    ) -> bool:
+        """Check if the location file on disk has all the hours of the date range."""
+
+        parquet_file = self.get_weather_parquet_path(run_id, location_id)
+        if not os.path.isfile(parquet_file):
+            return False
+
+        table = pq.read_table(
+            parquet_file, columns=[OpenMeteoClient.COMPLETENESS_COLUMN, "timezone"]
+        )
+        timezones = table.column("timezone").drop_null()
+        if len(timezones) == 0:
+            return False
+
+        # Local hours of the range (23 or 25 on the DST change days)
+        expected_hours = len(
+            pd.date_range(
+                start_date,
+                pd.Timestamp(end_date) + pd.Timedelta(days=1),
+                freq="h",
+                tz=timezones[0].as_py(),
+                inclusive="left",
+            )
+        )
+
+        # Hours with values, not rows: the lagging days of the archive are null
+        values = table.column(OpenMeteoClient.COMPLETENESS_COLUMN)
+        return len(values) - values.null_count >= expected_hours
+
     def save_weather_dataframe(
         self, run_id: str, location_id: int, df_weather: pd.DataFrame
     ) -> None:
         """Save the weather DataFrame to a Parquet file for the given run and location."""
 
-        output_path = os.path.join(config.DATA_PARQUET_PATH, run_id, "openmeteo")
-        os.makedirs(output_path, exist_ok=True)
-
-        parquet_file = os.path.join(
-            output_path,
-            f"{run_id}_location_{location_id}_weather.raw.parquet",
-        )
+        parquet_file = self.get_weather_parquet_path(run_id, location_id)
+        os.makedirs(os.path.dirname(parquet_file), exist_ok=True)
 
         df_weather.to_parquet(
             parquet_file,
             index=False,
-            compression="snappy",
+            **get_parquet_write_options(
+                pa.Schema.from_pandas(df_weather, preserve_index=False)
+            ),
         )
 
     def download_weather_data(
@@ -188,9 +329,35 @@ class OpenMeteoClient:
         longitude: float,
         start_date: str,
         end_date: str,
+        **kwargs,
     ) -> pd.DataFrame:
         """Download historical weather data from Open-Meteo API for a given location and date range."""
 
+        use_cache = kwargs.get("use_cache", True)
+
+        # Skip the request if the location file on disk already covers the range
+        # or only request the missing days (ongoing trimester, end_date = today)
+        cached_df = None
+        parquet_file = self.get_weather_parquet_path(run_id, location_id)
+        if use_cache and self.is_weather_cached(
+            run_id, location_id, start_date, end_date
+        ):
+            return pd.read_parquet(parquet_file)
+
+        if use_cache and os.path.isfile(parquet_file):
+            # The new hours are merged into the whole file (disk and GCS blob)
+            completeness_column = OpenMeteoClient.COMPLETENESS_COLUMN
+            cached_df = pd.read_parquet(parquet_file)
+
+            # Restart from the last hour with values: the null days (archive delay) are
+            # requested again, and the last day on disk can be partial
+            last_datetime = cached_df.loc[
+                cached_df[completeness_column].notna(), "datetimeto_local"
+            ].max()
+            if not pd.isna(last_datetime):
+                last_date = last_datetime.date().isoformat()
+                start_date = max(start_date, min(last_date, end_date))
+
         # # ---------------------------------------------------------------------
         # # TEMP CACHE
         # pickle_filepath = os.path.join(
@@ -213,6 +380,7 @@ class OpenMeteoClient:
             "start_date": start_date,
             "end_date": end_date,
             "timezone": "auto",  # important so we get local time data
+            "timeformat": "unixtime",  # UTC epochs: no datetime strings to parse
             "hourly": all_parameters_string,
             # "hourly": "temperature_2m,relative_humidity_2m,is_day",  # light version for testing
             # "hourly": "temperature_2m,relative_humidity_2m,dew_point_2m,apparent_temperature,precipitation,rain,snowfall,snow_depth,shortwave_radiation,direct_radiation,diffuse_radiation,global_tilted_irradiance,direct_normal_irradiance,terrestrial_radiation,weather_code,pressure_msl,surface_pressure,cloud_cover,cloud_cover_low,cloud_cover_mid,cloud_cover_high,vapour_pressure_deficit,et0_fao_evapotranspiration,wind_speed_100m,wind_speed_10m,wind_direction_10m,wind_direction_100m,wind_gusts_10m"
@@ -230,20 +398,323 @@ class OpenMeteoClient:
         # Transform the data into a standard DataFrame
         weather_df = self.construct_weather_dataframe(location_id, data)
 
-        # Save the weather data to GCS
+        return self.save_weather_data(
+            run_id, location_id, weather_df, cached_df=cached_df
+        )
+
+    def download_weather_data_from_bbox(
+        self,
+        run_id: str,
+        location_ids: np.ndarray,
+        latitudes: np.ndarray,
+        longitudes: np.ndarray,
+        bbox: tuple[float, float, float, float],
+        start_date: str,
+        end_date: str,
+    ) -> dict[int, pd.DataFrame]:
+        """Download historical weather data for all grid cells of a bounding box (x1, y1, x2, y2) in 1 request."""
+
+        x1, y1, x2, y2 = bbox  # OpenAQ order: lon/lat (same as CITY_BBOX)
+
+        # Locations outside of the bbox would be matched with a border cell (1 mask)
+        inside_bbox = (
+            (longitudes >= min(x1, x2))
+            & (longitudes <= max(x1, x2))
+            & (latitudes >= min(y1, y2))
+            & (latitudes <= max(y1, y2))
+        )
+        if not inside_bbox.all():
+            logger.warning(
+                f"Skipping {np.count_nonzero(~inside_bbox)} locations outside of the bbox: {location_ids[~inside_bbox].tolist()}"
+            )
+            location_ids = location_ids[inside_bbox]
+            latitudes = latitudes[inside_bbox]
+            longitudes = longitudes[inside_bbox]
+
+        url = "https://archive-api.open-meteo.com/v1/archive"
+        params = {
+            "bounding_box": f"{min(y1, y2)},{min(x1, x2)},{max(y1, y2)},{max(x1, x2)}",
+            "start_date": start_date,
+            "end_date": end_date,
+            "timezone": "auto",  # important so we get local time data
+            "timeformat": "unixtime",  # UTC epochs: no datetime strings to parse
+            "hourly": ",".join(OpenMeteoClient.FULL_PARAMETERS),
+        }
+        data = self.request_api(url, params)
+        grid_cells = data if isinstance(data, list) else [data]
+
+        # Match every location with its nearest grid cell (equirectangular distance)
+        cells_lat = np.array([cell["latitude"] for cell in grid_cells])
+        cells_lon = np.array([cell["longitude"] for cell in grid_cells])
+
+        d_lat = latitudes[:, None] - cells_lat[None, :]
+        d_lon = (longitudes[:, None] - cells_lon[None, :]) * np.cos(
+            np.radians(latitudes)
+        )[:, None]
+        nearest_cells = np.argmin(d_lat**2 + d_lon**2, axis=1)
+
+        all_weather = {}
+        for location_id, cell_index in zip(location_ids.tolist(), nearest_cells):
+            weather_df = self.construct_weather_dataframe(
+                location_id, grid_cells[cell_index]
+            )
+            all_weather[location_id] = self.save_weather_data(
+                run_id, location_id, weather_df
+            )
+
+        return all_weather
+
+    def download_weather_data_batch(
+        self,
+        run_id: str,
+        location_ids: list[int],
+        latitudes: list[float],
+        longitudes: list[float],
+        start_date: str,
+        end_date: str,
+    ) -> dict[int, pd.DataFrame]:
+        """Download historical weather data of several locations in 1 request (multi-location coordinates)."""
+
+        url = "https://archive-api.open-meteo.com/v1/archive"
+        params = {
+            "latitude": ",".join(str(latitude) for latitude in latitudes),
+            "longitude": ",".join(str(longitude) for longitude in longitudes),
+            "start_date": start_date,
+            "end_date": end_date,
+            "timezone": "auto",  # important so we get local time data
+            "timeformat": "unixtime",  # UTC epochs: no datetime strings to parse
+            "hourly": ",".join(OpenMeteoClient.FULL_PARAMETERS),
+        }
+        data = self.request_api(url, params)
+        all_data = data if isinstance(data, list) else [data]  # 1 location = 1 object
+
+        all_weather = {}
+        for location_id, location_data in zip(location_ids, all_data):
+            weather_df = self.construct_weather_dataframe(location_id, location_data)
+            all_weather[location_id] = self.save_weather_data(
+                run_id, location_id, weather_df
+            )
+
+        return all_weather
+
+    async def request_with_backoff_async(
+        self, func, semaphore: asyncio.Semaphore, calls: int, *args, **kwargs
+    ) -> Any:
+        """Run a blocking download in a worker thread once the rate limit allows it (backoff on 429)."""
+
+        async with semaphore:
+            for retry in range(OpenMeteoClient.MAX_RATELIMIT_RETRIES + 1):
+                await self.ratelimit.acquire(calls)
+                try:
+                    return await asyncio.to_thread(func, *args, **kwargs)
+                except requests.exceptions.HTTPError as err:
+                    if (
+                        err.response is None
+                        or err.response.status_code != 429
+                        or retry == OpenMeteoClient.MAX_RATELIMIT_RETRIES
+                    ):
+                        raise err
+
+                    # Retry-After (seconds) when the API sends it, else exponential backoff
+                    retry_after = err.response.headers.get("Retry-After", "")
+                    backoff = (
+                        int(retry_after)
+                        if retry_after.isdigit()
+                        else OpenMeteoClient.RATELIMIT_BACKOFF * 2**retry
+                    )
+                    self.ratelimit.drain(backoff)
+                    logger.trace(
+                        f"{hex('#dfa934')}WAIT{rst()}{grey()}: Retrying {func.__name__} in {backoff}s (rate limit){rst()}"
+                    )
+                    await asyncio.sleep(backoff)
+
+    async def download_locations_weather_data_async(
+        self,
+        run_id: str,
+        location_ids: np.ndarray,
+        latitudes: np.ndarray,
+        longitudes: np.ndarray,
+        start_date: str,
+        end_date: str,
+        **kwargs,
+    ) -> dict[int, pd.DataFrame]:
+        """Download the weather data of several locations concurrently (batched requests, arrays of the same length)."""
+
+        max_concurrency = kwargs.get(
+            "max_concurrency", OpenMeteoClient.MAX_CONCURRENT_LOCATIONS
+        )
+        batch_size = kwargs.get("batch_size", OpenMeteoClient.LOCATIONS_PER_REQUEST)
+        progress = kwargs.get("progress", None)  # ProgressLogger
+
+        if (
+            batch_size * OpenMeteoClient.ESTIMATED_CALLS_PER_REQUEST
+            > self.ratelimit.capacity
+        ):
+            raise ValueError(
+                f"batch_size={batch_size} exceeds the rate limit budget (max: {OpenMeteoClient.LOCATIONS_PER_REQUEST})."
+            )
+
+        start_time = time.perf_counter()
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+        total = len(location_ids)
+        all_weather = {}
+
+        # Locations sharing the same coordinates get the same weather: 1 request each
+        coordinates = np.round(np.column_stack([latitudes, longitudes]), 4)
+        _, first_indices, inverse = np.unique(
+            coordinates, axis=0, return_index=True, return_inverse=True
+        )
+        inverse = inverse.ravel()
+
+        # Location ids of every coordinates group (computed once, not per group)
+        group_location_ids = np.split(
+            location_ids[np.argsort(inverse, kind="stable")],
+            np.cumsum(np.bincount(inverse))[:-1],
+        )
+
+        def _print_progress(location_id: int) -> None:
+            if progress is not None:
+                done = len(all_weather)
+                progress.print(
+                    f"Downloaded weather data (location_id={location_id})"
+                    if done < total
+                    else f"Downloaded {done} weather data in {exec_time(start_time, fmt=True)}",
+                    current_progress=done,
+                    total_progress=total,
+                    prefix_msg=f"{done}/{total}",
+                    last=done == total,
+                )
+
+        async def _fan_out(group_index: int, weather_df: pd.DataFrame) -> None:
+            # Save the response for all the locations with the same coordinates
+            for alias_id in group_location_ids[group_index].tolist():
+                if alias_id in all_weather:
+                    continue
+
+                if self.is_weather_cached(run_id, alias_id, start_date, end_date):
+                    all_weather[alias_id] = pd.read_parquet(
+                        self.get_weather_parquet_path(run_id, alias_id)
+                    )
+                else:
+                    all_weather[alias_id] = await asyncio.to_thread(
+                        self.save_weather_data,
+                        run_id,
+                        alias_id,
+                        weather_df.assign(location_id=alias_id),
+                    )
+                _print_progress(alias_id)
+
+        async def _download_single(group_index: int) -> None:
+            # Files on disk: full = no api call, partial = only the missing days
+            first_index = first_indices[group_index]
+            location_id = int(location_ids[first_index])
+            is_cached = self.is_weather_cached(
+                run_id, location_id, start_date, end_date
+            )
+
+            if is_cached:
+                weather_df = pd.read_parquet(
+                    self.get_weather_parquet_path(run_id, location_id)
+                )
+            else:
+                weather_df = await self.request_with_backoff_async(
+                    self.download_weather_data,
+                    semaphore,
+                    OpenMeteoClient.ESTIMATED_CALLS_PER_REQUEST,
+                    run_id=run_id,
+                    location_id=location_id,
+                    latitude=float(latitudes[first_index]),
+                    longitude=float(longitudes[first_index]),
+                    start_date=start_date,
+                    end_date=end_date,
+                )
+            all_weather[location_id] = weather_df
+            _print_progress(location_id)
+
+            await _fan_out(group_index, weather_df)
+
+        async def _download_batch(group_indices: list[int]) -> None:
+            # Multi-location request (the api still counts the calls per location)
+            batch_indices = first_indices[group_indices]
+            batch_ids = location_ids[batch_indices].tolist()
+
+            batch_weather = await self.request_with_backoff_async(
+                self.download_weather_data_batch,
+                semaphore,
+                OpenMeteoClient.ESTIMATED_CALLS_PER_REQUEST * len(batch_ids),
+                run_id,
+                batch_ids,
+                latitudes[batch_indices].tolist(),
+                longitudes[batch_indices].tolist(),
+                start_date,
+                end_date,
+            )
+            for group_index, location_id in zip(group_indices, batch_ids):
+                all_weather[location_id] = batch_weather[location_id]
+                _print_progress(location_id)
+
+                await _fan_out(group_index, batch_weather[location_id])
+
+        # Only the locations without any file on disk can share a request
+        batched_groups = (
+            [
+                group_index
+                for group_index, first_index in enumerate(first_indices)
+                if not os.path.isfile(
+                    self.get_weather_parquet_path(
+                        run_id, int(location_ids[first_index])
+                    )
+                )
+            ]
+            if batch_size > 1
+            else []
+        )
+        single_groups = sorted(set(range(len(first_indices))) - set(batched_groups))
+
+        async with asyncio.TaskGroup() as tg:
+            for i in range(0, len(batched_groups), batch_size):
+                tg.create_task(_download_batch(batched_groups[i : i + batch_size]))
+
+            for group_index in single_groups:
+                tg.create_task(_download_single(group_index))
+
+        return all_weather
+
+    def save_weather_data(
+        self, run_id: str, location_id: int, weather_df: pd.DataFrame, **kwargs
+    ) -> pd.DataFrame:
+        """Save the weather DataFrame of a location to GCS and/or disk and return the cleaned DataFrame."""
+
+        cached_df = kwargs.get("cached_df", None)  # previous data of the file on disk
+
+        cleaned_df = OpenMeteoHistoricalTable().clean_dataframe(weather_df)
+
+        # Append the new hours to the ones already on disk (incremental download)
+        if cached_df is not None and not cached_df.empty:
+            cleaned_df = pd.concat(
+                [
+                    cached_df[
+                        ~cached_df["datetimeto_utc"].isin(cleaned_df["datetimeto_utc"])
+                    ],
+                    cleaned_df,
+                ],
+                ignore_index=True,
+            )
+
+        # Save the weather data to GCS: the whole location (same blob name for each
+        # run and location, the merge into Big Query is idempotent)
         if OpenMeteoClient.SAVE_TO_GCS:
             # gcs_time = time.perf_counter()
             parquet_filename = f"{run_id}_historical_{location_id}.raw.parquet"
-            cleaned_df = OpenMeteoHistoricalTable().save_dataframe_to_gcs(
-                weather_df,
-                "staging",
-                f"openmeteo/historical/{parquet_filename}",
+            blob_name = f"openmeteo/historical/{parquet_filename}"
+            OpenMeteoHistoricalTable().save_dataframe_to_gcs(
+                cleaned_df, "staging", blob_name
             )
             # logger.trace(f"GCS upload time: {exec_time(gcs_time, fmt=True)}")  # break the progress logger line
 
+        # Save the weather data to a Parquet file (for the run/trimester/location)
         if OpenMeteoClient.SAVE_TO_DISK:
-            cleaned_df = OpenMeteoHistoricalTable().clean_dataframe(weather_df)
-            # Save the weather data to a Parquet file (for the run/trimester/location)
             self.save_weather_dataframe(run_id, location_id, cleaned_df)
 
         return cleaned_df
@@ -5,6 +5,18 @@ from openaq_anomaly_prediction.config import Configuration as cfg  # noqa: F401
 from openaq_anomaly_prediction.utils.logger import logger
 
 
+# pandas dtypes of the columns missing from a dataframe (typed nulls, see reindex_to_schema)
+_MISSING_FIELD_DTYPES = {
+    "STRING": "string",
+    "INT64": "Int64",
+    "FLOAT64": "float64",
+    "BOOL": "boolean",
+    "BOOLEAN": "boolean",
+    "TIMESTAMP": "datetime64[us, UTC]",
+    "DATETIME": "datetime64[us]",
+}
+
+
 class BaseTable:
     """Inheritable class for BigQuery table management."""
 
@@ -44,13 +56,28 @@ class BaseTable:
 
         # Convert columns with "datetime" in their names to datetime types
         datetime_fields = [col for col in df.columns if "datetime" in col]
+        # ISO 8601 strings are parsed with a fixed format, once per column (not per row)
         for col in datetime_fields:
-            if "local" in col:
+            # Strings only (not all-NaN floats, nor objects holding datetimes)
+            is_text = pd.api.types.is_string_dtype(df[col]) and (
+                df[col].dtype != object
+                or pd.api.types.infer_dtype(df[col], skipna=True) == "string"
+            )
+            if "local" in col and is_text:
+                # Keep the wall time: drop the offset (mixed offsets with DST)
+                df[col] = pd.to_datetime(
+                    df[col].str.slice(0, 19), format="%Y-%m-%dT%H:%M:%S", cache=True
+                ).dt.floor("us")
+            elif "local" in col:
                 df[col] = (
                     pd.to_datetime(df[col], utc=False)
                     .dt.tz_localize(None)
                     .dt.floor("us")
                 )  # remove timezone info (naive datetime)
+            elif is_text:
+                df[col] = pd.to_datetime(
+                    df[col], format="ISO8601", utc=True, cache=True
+                ).dt.floor("us")
             else:
                 df[col] = pd.to_datetime(df[col], utc=True).dt.floor("us")
 
@@ -76,6 +103,27 @@ class BaseTable:
 
         return df
 
+    def reindex_to_schema(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Reorder the columns to match the schema, adding the missing ones as typed nulls."""
+
+        if self.schema is None:
+            raise ValueError("Table schema must be defined.")
+
+        # Same Parquet schema for every file, whatever the columns returned by the APIs
+        # (reindex alone would add the missing columns as float64 NaNs)
+        missing_columns = {
+            field.name: pd.Series(
+                index=df.index,
+                dtype=_MISSING_FIELD_DTYPES.get(field.field_type, "object"),
+            )
+            for field in self.schema
+            if field.name not in df.columns
+        }
+        if len(missing_columns) > 0:
+            df = df.assign(**missing_columns)
+
+        return df[[field.name for field in self.schema]]
+
 
 if __name__ == "__main__":
     logger.info(
@@ -148,6 +148,7 @@ class OpenAQMeasurementsTable(BaseTable):
 
         verbose = kwargs.get("verbose", 5)
         debug_inline = kwargs.get("debug_inline", True)
+        run_id = kwargs.get("run_id", None)  # only load the files of one run
 
         start_time = time.perf_counter()
 
@@ -164,7 +165,9 @@ class OpenAQMeasurementsTable(BaseTable):
             table=self,
             merge_keys=["sensor_id", "period_datetimeTo_utc"],
             bucket_uri=bucket_uri,
-            prefix_uri="openaq/measurements",
+            prefix_uri="openaq/measurements"
+            if run_id is None
+            else f"openaq/measurements/{run_id}",
         )
 
         if verbose >= 3 and not debug_inline:
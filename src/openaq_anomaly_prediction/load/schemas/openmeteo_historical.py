@@ -128,9 +128,8 @@ class OpenMeteoHistoricalTable(BaseTable):
         cleaned_df["updated_at"] = now
         cleaned_df["refreshed_at"] = now
 
-        # Reorder columns to match schema
-        schema_fields = [field.name for field in self.schema]
-        cleaned_df = cleaned_df.reindex(columns=schema_fields)
+        # Reorder columns to match schema (fixed schema for all the location files)
+        cleaned_df = self.reindex_to_schema(cleaned_df)
 
         return cleaned_df
 
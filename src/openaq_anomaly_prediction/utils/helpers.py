@@ -3,21 +3,47 @@ Helper utility functions.
 """
 
 import calendar
+import functools
 import glob
 import json
 import os
 import time
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 from pathlib import Path
-from typing import List, Literal, Tuple, Union, overload
+from typing import List, Literal, NamedTuple, Tuple, overload
 
 import pandas as pd
 import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
 import pyarrow.parquet as pq
 
 from openaq_anomaly_prediction.config import Configuration as config
 from openaq_anomaly_prediction.utils.logger import ProgressLogger, logger
 
+# Standard options for all the Parquet files written on disk (pq.write_table kwargs)
+PARQUET_WRITE_OPTIONS = {
+    "compression": "zstd",
+    "compression_level": 3,
+    "use_dictionary": True,
+    "data_page_size": 1 << 20,  # 1 MiB
+    "write_statistics": True,  # min/max per row group (predicate pushdown)
+}
+
+
+def get_parquet_write_options(schema: pa.Schema) -> dict:
+    """Get the local Parquet write options for a schema (BYTE_STREAM_SPLIT floats)."""
+
+    # High cardinality floats: split bytes compress better than dictionary pages
+    # NOT for the files loaded in BigQuery (see PARQUET_WRITE_OPTIONS)
+    float_columns = [field.name for field in schema if pa.types.is_floating(field.type)]
+    other_columns = [field.name for field in schema if field.name not in float_columns]
+
+    return PARQUET_WRITE_OPTIONS | {
+        "use_dictionary": other_columns,
+        "use_byte_stream_split": float_columns,
+    }
+
 
 def get_iso_now() -> str:
     """Get the current date and time in ISO 8601 format with UTC offset."""
@@ -89,10 +115,12 @@ def get_monthly_periods(year: int) -> List[Tuple[str, str]]:
     return periods
 
 
-def get_trimestrial_periods(year: int) -> List[Tuple[str, str]]:
+@functools.lru_cache(maxsize=64)
+def get_trimestrial_periods(year: int) -> Tuple[Tuple[str, str], ...]:
     """
-    Generates a list of (start_datetime, end_datetime) strings for every
-    month within the given year, formatted as ISO 8601 with UTC offset.
+    Generates a tuple of (start_datetime, end_datetime) strings for every
+    trimester within the given year, formatted as ISO 8601 with UTC offset.
+    Cached (immutable result) since the same years are requested on every run.
     """
 
     trimesters = []
@@ -102,7 +130,44 @@ def get_trimestrial_periods(year: int) -> List[Tuple[str, str]]:
         end_month = monthly_periods[i + 2]
         trimesters.append((start_month[0], end_month[1]))
 
-    return trimesters
+    return tuple(trimesters)
+
+
+class TrimesterSpec(NamedTuple):
+    """A trimester with its bounds pre-parsed (ISO datetimes, dates and YYYY-MM-DD strings)."""
+
+    datetime_from: str
+    datetime_to: str
+    date_from: date
+    date_to: date
+    from_str: str
+    to_str: str
+
+    def to_capped_str(self, today: date) -> str:
+        """Get the end date (YYYY-MM-DD) capped to today (ongoing trimester)."""
+        return self.to_str if self.date_to <= today else today.isoformat()
+
+
+@functools.lru_cache(maxsize=64)
+def get_trimester_specs(year: int) -> Tuple[TrimesterSpec, ...]:
+    """Get the trimesters of the given year, parsed once (cached like get_trimestrial_periods)."""
+
+    specs = []
+    for datetime_from, datetime_to in get_trimestrial_periods(year):
+        date_from = datetime.fromisoformat(datetime_from).date()
+        date_to = datetime.fromisoformat(datetime_to).date()
+        specs.append(
+            TrimesterSpec(
+                datetime_from,
+                datetime_to,
+                date_from,
+                date_to,
+                date_from.isoformat(),
+                date_to.isoformat(),
+            )
+        )
+
+    return tuple(specs)
 
 
 # def concatenate_csv_files(
@@ -183,46 +248,63 @@ def get_parquet_filepaths(
     relative_path: str, search_pattern: str = "*.parquet"
 ) -> list[str]:
     """Get all Parquet filepaths from the default Parquet data directory."""
-    parquet_path = config.DATA_PARQUET_PATH
+    # 1 relative pattern from the Path: wildcards are also allowed in relative_path
     if relative_path is not None:
-        parquet_path = os.path.join(parquet_path, relative_path)
-    all_files = glob.glob(os.path.join(parquet_path, search_pattern))
+        search_pattern = f"{Path(relative_path).as_posix()}/{search_pattern}"
+    all_files = sorted(
+        str(file_path) for file_path in config.DATA_PARQUET_PATH.glob(search_pattern)
+    )
     return all_files
 
 
 def parquets_to_csv(
-    files: list[str], filename: str, output_path: str | Path = config.DATA_CSV_PATH
+    files: list[str],
+    filename: str,
+    output_path: str | Path = config.DATA_CSV_PATH,
+    columns: list[str] | None = None,
 ) -> None:
-    """Concatenate multiple Parquet files into a single CSV file."""
+    """Concatenate multiple Parquet files into a single CSV file (only the given columns, if any)."""
 
     progress = ProgressLogger()
-    total_files = len(files)
 
     output_csv_path = os.path.join(output_path, filename)  # custom output path
     os.makedirs(output_path, exist_ok=True)
 
-    # Iterate through each file and write to the output file
-    for i, file in enumerate(files):
+    # Skip the unreadable files
+    readable_files = []
+    for file in files:
         try:
-            df = pd.read_parquet(file)
+            pq.read_schema(file, memory_map=True)
+            readable_files.append(file)
         except Exception as e:
             print(f"Error reading {file}: {e}. Skipping.")
-            continue  # Skip to the next file
 
-        if i == 0:
-            # First file: Write the header row and reset file (w)
-            df.to_csv(output_csv_path, mode="w", index=False, header=True)
-        else:
-            # Subsequent files: Append without the header row (a)
-            df.to_csv(output_csv_path, mode="a", index=False, header=False)
+    total_files = len(readable_files)
+    if total_files == 0:
+        return
 
-        progress.print(
-            f"Appending parquet files to final CSV -> data/csv/{filename}",
-            current_progress=i + 1,
-            total_progress=total_files,
-            prefix_msg=f"{i + 1}/{total_files}",
-            last=(i + 1 == total_files),
-        )
+    schema = _unify_parquet_schemas(readable_files, columns)
+
+    # APPEND each file to the CSV file (header written once)
+    # Formatted by DataFrame.to_csv, 1 call per file: same output as before (quoting, datetimes)
+    with open(output_csv_path, "w", newline="") as csv_file:
+        for i, file in enumerate(readable_files):
+            parquet_file = pq.ParquetFile(file, memory_map=True)
+            file_columns = [
+                name for name in schema.names if name in parquet_file.schema_arrow.names
+            ]
+
+            _align_table(
+                parquet_file.read(columns=file_columns), schema
+            ).to_pandas().to_csv(csv_file, index=False, header=i == 0)
+
+            progress.print(
+                f"Appending parquet files to final CSV -> data/csv/{filename}",
+                current_progress=i + 1,
+                total_progress=total_files,
+                prefix_msg=f"{i + 1}/{total_files}",
+                last=(i + 1 == total_files),
+            )
 
 
 def concat_csv_to_csv(
@@ -260,10 +342,54 @@ def concat_csv_to_csv(
         )
 
 
+def _unify_parquet_schemas(
+    files: list[str], columns: list[str] | None = None
+) -> pa.Schema:
+    """Unify the schemas of Parquet files from their footers only (projected on the given columns, if any)."""
+
+    # Files can have different columns (e.g. Open-Meteo parameters changed over time):
+    # the union is used and all-null columns are promoted to the other files type
+    schema = pa.unify_schemas(
+        [pq.read_schema(file_path, memory_map=True) for file_path in files],
+        promote_options="permissive",
+    )
+
+    # The pandas metadata only describes the columns of the first file
+    schema = schema.remove_metadata()
+
+    # PROJECT the columns: the other ones are never read/decoded
+    if columns is not None:
+        schema = pa.schema(
+            [schema.field(name) for name in columns if name in schema.names]
+        )
+
+    return schema
+
+
+def _align_table(table: pa.Table, schema: pa.Schema) -> pa.Table:
+    """Cast a table to a (unified) schema, adding the missing columns as nulls."""
+
+    # Homogeneous files (the usual case): the decoded columns are passed through as is
+    if table.schema.equals(schema, check_metadata=False):
+        return table
+
+    columns = [
+        table.column(field.name).cast(field.type)
+        if field.name in table.column_names
+        else pa.nulls(table.num_rows, field.type)
+        for field in schema
+    ]
+
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
 def concat_pq_to_pq(
-    files: list[str], filename: str, output_path: str | Path = config.DATA_EXPORT_PATH
+    files: list[str],
+    filename: str,
+    output_path: str | Path = config.DATA_EXPORT_PATH,
+    columns: list[str] | None = None,
 ) -> str | None:
-    """Concatenate multiple Parquet files into a single Parquet file."""
+    """Concatenate multiple Parquet files into a single Parquet file (only the given columns, if any)."""
 
     if len(files) == 0:
         logger.trace("No files to concatenate.")
@@ -273,34 +399,115 @@ def concat_pq_to_pq(
 
     output_file_path = os.path.join(output_path, f"{filename}")
 
-    # READ files into PyArrow Tables
+    # UNIFY the schemas in a metadata-only pass (missing columns are filled with nulls)
+    schema = _unify_parquet_schemas(files, columns)
+
+    # STREAM row groups into the output file: only 1 row group in memory at a time
     total_rows = 0
-    tables_to_concatenate = []
-    for file_path in files:
-        table = pq.read_table(file_path)
-        # print(f"Reading {file_path} into PyArrow Table: {table.num_rows} rows...")
-        # print(f"{table.num_rows} rows...")
-        total_rows += table.num_rows
-        tables_to_concatenate.append(table)
-
-    if len(tables_to_concatenate) == 0:
-        logger.trace("No table to concatenate.")
+    written_rows = 0
+    with pq.ParquetWriter(
+        output_file_path, schema, **get_parquet_write_options(schema)
+    ) as writer:
+        for file_path in files:
+            # Memory-mapped: pages are decoded from the page cache without a copy
+            parquet_file = pq.ParquetFile(file_path, memory_map=True)
+            total_rows += parquet_file.metadata.num_rows
+
+            file_columns = [
+                name for name in schema.names if name in parquet_file.schema_arrow.names
+            ]
+
+            for row_group in range(parquet_file.num_row_groups):
+                aligned_table = _align_table(
+                    parquet_file.read_row_group(row_group, columns=file_columns),
+                    schema,
+                )
+                writer.write_table(aligned_table)
+                written_rows += aligned_table.num_rows
+
+    if written_rows != total_rows:
+        raise ValueError("Row count mismatch after concatenation")
+
+    logger.trace(
+        f"Concatenated {len(files)} tables in {exec_time(start_time, fmt=True)}: {written_rows} total rows"
+    )
+
+    return output_file_path
+
+
+def write_pq_dataset(
+    files: list[str],
+    dirname: str,
+    output_path: str | Path = config.DATA_EXPORT_PATH,
+    datetime_column: str = "datetimeto_local",
+    columns: list[str] | None = None,
+) -> str | None:
+    """Write multiple Parquet files as 1 dataset partitioned by year/trimester (hive) of a datetime column."""
+
+    if len(files) == 0:
+        logger.trace("No files to write in the dataset.")
         return None
 
-    # CONCAT all tables into a single table
-    concatenated_table = pa.concat_tables(tables_to_concatenate)
+    start_time = time.perf_counter()
 
-    if concatenated_table.num_rows != total_rows:
-        raise ValueError("Row count mismatch after concatenation")
-    else:
-        # WRITE the concatenated table to a single Parquet file
-        pq.write_table(concatenated_table, output_file_path)
+    output_dir_path = os.path.join(output_path, dirname)
+
+    # UNIFY the schemas in a metadata-only pass (missing columns are scanned as nulls)
+    schema = _unify_parquet_schemas(files)
+    dataset = ds.dataset(files, schema=schema, format="parquet")
+
+    # PROJECT the columns and add the partition columns (computed while scanning)
+    projection = {
+        name: ds.field(name)
+        for name in (schema.names if columns is None else columns)
+        if name in schema.names
+    }
+    projection["year"] = pc.year(ds.field(datetime_column))
+    projection["trimester"] = pc.quarter(ds.field(datetime_column))
+
+    # STREAM the batches into the partitions (no full table in memory)
+    scanner = dataset.scanner(columns=projection)
+    ds.write_dataset(
+        scanner,
+        output_dir_path,
+        format="parquet",
+        partitioning=["year", "trimester"],
+        partitioning_flavor="hive",
+        existing_data_behavior="delete_matching",  # rewrite the partitions written
+        file_options=ds.ParquetFileFormat().make_write_options(
+            **get_parquet_write_options(scanner.projected_schema)
+        ),
+    )
 
-        logger.trace(
-            f"Concatenated {len(tables_to_concatenate)} tables in {exec_time(start_time, fmt=True)}: {concatenated_table.num_rows} total rows"
-        )
+    logger.trace(
+        f"Wrote {len(files)} tables in a partitioned dataset in {exec_time(start_time, fmt=True)}"
+    )
+
+    return output_dir_path
 
-        return output_file_path
+
+def read_manifest(filepath: str | Path) -> pd.DataFrame:
+    """Read a downloads manifest (Parquet), or an empty DataFrame if it doesn't exist yet."""
+
+    if not os.path.isfile(filepath):
+        return pd.DataFrame()
+
+    return pq.read_table(filepath).to_pandas()
+
+
+def write_manifest(manifest: pd.DataFrame, filepath: str | Path) -> None:
+    """Atomically (re)write a downloads manifest (Parquet)."""
+
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+
+    # Write next to the target then swap, so an interrupted run never corrupts it
+    tmp_filepath = f"{filepath}.tmp"
+    pq.write_table(
+        pa.Table.from_pandas(manifest, preserve_index=False),
+        tmp_filepath,
+        compression="zstd",
+    )
+    os.replace(tmp_filepath, filepath)
 
 
 def _safe_serialize(obj):
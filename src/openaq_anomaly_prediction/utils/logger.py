@@ -1,4 +1,7 @@
+import contextlib
 import sys
+import time
+from collections.abc import Iterator
 from datetime import datetime
 
 from loguru import logger
@@ -84,11 +87,23 @@ class ProgressLogger:
     # _TIME_GRADIENT_END = "#C1372E"
     _TIME_GRADIENT_STEPS = 1 / len(_TIME_GRADIENT)
 
-    def __init__(self) -> None:
+    # Default min_interval when redirected: every update is a new line (not overwritten)
+    NON_TTY_MIN_INTERVAL = 5.0
+
+    def __init__(self, min_interval: float | None = None) -> None:
         # Track the length of the last progress line so we can fully clear it even when the
         # new message is shorter (helps in notebook/stdout environments with no terminal width).
         self._last_progress_len = 0
 
+        # No carriage returns when redirected (docker logs, files): 1 line per update
+        self._is_tty = sys.stdout.isatty()
+
+        # Intermediate updates closer than min_interval (seconds) are dropped (last ones never)
+        if min_interval is None:
+            min_interval = 0.0 if self._is_tty else ProgressLogger.NON_TTY_MIN_INTERVAL
+        self.min_interval = min_interval
+        self._last_print_time = 0.0
+
     # ---------------------------------------------------------------------
     # STATIC METHODS
 
@@ -134,6 +149,12 @@ class ProgressLogger:
         # suffix_msg = kwargs.get("suffix_msg", None)
         last = kwargs.get("last", False)
 
+        # Rate limit the writes to stdout (concurrent downloads can spam updates)
+        print_time = time.monotonic()
+        if not last and print_time - self._last_print_time < self.min_interval:
+            return
+        self._last_print_time = print_time
+
         now = datetime.now().strftime("%H:%M:%S")
         prefix = "" if prefix_msg is None else prefix_msg  # default
         # suffix = "" if suffix_msg is None else suffix_msg  # default
@@ -158,18 +179,32 @@ class ProgressLogger:
         padding = max(self._last_progress_len - len(progress_str), 0)
         self._last_progress_len = len(progress_str)
 
-        print(f"\r{clr()}{progress_str}{' ' * padding}", end="", flush=True)
-        # print(f"{progress_str}{' ' * padding}{clr()}", end="\r", flush=True)
-
-        if last:
-            print()
-            # self.end()
+        # 1 write + 1 flush per update (the newline of the last one included)
+        if not self._is_tty:
+            sys.stdout.write(f"{progress_str}\n")
+        else:
+            end = "\n" if last else ""
+            sys.stdout.write(f"\r{clr()}{progress_str}{' ' * padding}{end}")
+            # print(f"{progress_str}{' ' * padding}{clr()}", end="\r", flush=True)
+        sys.stdout.flush()
 
     # def end(self) -> None:
     #     """End the progress log with a newline."""
     #     print()
 
 
+@contextlib.contextmanager
+def hidden_cursor() -> Iterator[None]:
+    """Hide the terminal cursor (progress logs) and ALWAYS show it again on exit."""
+    sys.stdout.write("\033[?25l")
+    sys.stdout.flush()
+    try:
+        yield
+    finally:
+        sys.stdout.write("\033[?25h")
+        sys.stdout.flush()
+
+
 def b() -> str:
     """Return a Bold ANSI code."""
     return "\x1b[1m"